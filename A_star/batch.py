@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+import time
+from multiprocessing import Pool
+
+from board import BOARD_EXTENSIONS, board_cache
+from frontier import FRONTIERS
+from landmarks import index_for
+from main import SEARCHES, find_path, solve
+from result import SearchResult
+from stats import SearchStats
+
+
+# Lists every board file in the given directories (files are kept as is).
+# Other files, like the landmark indexes, are skipped.
+def list_boards(paths):
+    boards = []
+    for path in paths:
+        if os.path.isdir(path):
+            for board in sorted(os.listdir(path)):
+                board_path = os.path.join(path, board)
+                if os.path.isfile(board_path) and \
+                        board.endswith(BOARD_EXTENSIONS):
+                    boards.append(board_path)
+        else:
+            boards.append(path)
+    return boards
+
+
+# Solves a single (board, algorithm, compact, start, goal, options) job.
+# Runs inside the worker processes, which keep their parsed boards in the
+# board cache. The options (the frontier, and landmarks=True to use the
+# board's landmark index) only apply to a_star and dijkstra. With
+# stats=True the search counters are added to the result as "stats", and
+# with auto_jps=False a_star and bfs never run Jump Point Search on
+# uniform cost boards (see main.solve).
+def solve_job(job):
+    board_path, algorithm, compact, start, goal, options = job
+    # Parses the board (once per worker) before the timing starts
+    board_cache.get(board_path, compact)
+    stats = SearchStats() if options.get('stats') else None
+    auto_jps = options.get('auto_jps', True)
+    if algorithm not in ('a_star', 'dijkstra'):
+        options = {}
+    elif options.get('landmarks'):
+        options = dict(options, landmarks=index_for(board_path))
+    options = dict(options, stats=stats, auto_jps=auto_jps)
+    started = time.perf_counter()
+    result = solve(board_path, algorithm, compact, start, goal, **options)
+    data = result.to_dict()
+    data['time'] = time.perf_counter() - started
+    if stats is not None:
+        data['stats'] = stats.to_dict()
+    return data
+
+
+# Runs the jobs over a process pool. The results come back in job order.
+def run_jobs(jobs, workers=None, chunksize=4):
+    if workers == 1:
+        return [solve_job(job) for job in jobs]
+    with Pool(workers) as pool:
+        return pool.map(solve_job, jobs, chunksize)
+
+
+# Reads start/goal queries from a JSON lines file. Every line has a
+# "board", and optionally "start" and "goal" as [x, y] and an "algorithm".
+def read_queries(queries_file, algorithms, compact=False, options=None):
+    jobs = []
+    with open(queries_file) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            query = json.loads(line)
+            start = query.get('start')
+            goal = query.get('goal')
+            if 'algorithm' in query:
+                query_algorithms = [query['algorithm']]
+            else:
+                query_algorithms = algorithms
+            for algorithm in query_algorithms:
+                jobs.append((query['board'], algorithm, compact,
+                             tuple(start) if start else None,
+                             tuple(goal) if goal else None, options or {}))
+    return jobs
+
+
+# Solves every job and writes one JSON line each
+def write_results(jobs, output, workers=None):
+    started = time.perf_counter()
+    results = run_jobs(jobs, workers)
+    elapsed = time.perf_counter() - started
+    with open(output, 'w') as f:
+        for data in results:
+            f.write(json.dumps(data) + '\n')
+    return len(results), elapsed
+
+
+# Solves every board with every algorithm, from the A to the B of the board
+def solve_boards(paths, algorithms, output, compact=False, workers=None,
+                 options=None):
+    jobs = [(board_path, algorithm, compact, None, None, options or {})
+            for board_path in list_boards(paths)
+            for algorithm in algorithms]
+    return write_results(jobs, output, workers)
+
+
+# Renders the results of an earlier run, one after another
+def replay(results_file):
+    with open(results_file) as f:
+        for line in f:
+            if line.strip():
+                find_path(SearchResult.from_dict(json.loads(line)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Solves every board under the given directories '
+                    'without rendering, and writes the results as JSON '
+                    'lines.')
+    parser.add_argument('paths', nargs='*', default=['boards'],
+                        help='board directories or files')
+    parser.add_argument('-a', '--algorithm', action='append',
+                        choices=sorted(SEARCHES),
+                        help='algorithm to run (repeatable, default all)')
+    parser.add_argument('-o', '--output', default='results.jsonl',
+                        help='JSON lines file to write')
+    parser.add_argument('--compact', action='store_true',
+                        help='use the compact GridBoard')
+    parser.add_argument('--frontier', choices=sorted(FRONTIERS),
+                        default='heap',
+                        help='frontier of a_star and dijkstra')
+    parser.add_argument('--alt', action='store_true',
+                        help='use the landmark (ALT) heuristic for a_star, '
+                             'building the board indexes if needed')
+    parser.add_argument('--stats', action='store_true',
+                        help='add the search counters (expansions, pushes, '
+                             'stale pops, peak frontier, time in the board '
+                             'calls) to every result')
+    parser.add_argument('--no-jps', action='store_true',
+                        help="don't run Jump Point Search instead of a_star "
+                             'and bfs on uniform cost boards')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='worker processes (default: all cores)')
+    parser.add_argument('-q', '--queries', metavar='QUERIES',
+                        help='JSON lines file of start/goal queries to solve '
+                             'instead of the A to B of every board')
+    parser.add_argument('--replay', metavar='RESULTS',
+                        help='render the results of an earlier run instead')
+    args = parser.parse_args(argv)
+
+    if args.replay:
+        replay(args.replay)
+        return
+    algorithms = args.algorithm or ['a_star', 'dijkstra', 'bfs']
+    options = {'frontier': args.frontier}
+    if args.alt:
+        options['landmarks'] = True
+    if args.stats:
+        options['stats'] = True
+    if args.no_jps:
+        options['auto_jps'] = False
+    if args.queries:
+        jobs = read_queries(args.queries, algorithms, args.compact, options)
+        count, elapsed = write_results(jobs, args.output, args.workers)
+    else:
+        count, elapsed = solve_boards(args.paths, algorithms, args.output,
+                                      args.compact, args.workers, options)
+    print("Wrote " + str(count) + " results to " + args.output)
+    print("Solved %d queries in %.3fs (%.1f queries/s)" %
+          (count, elapsed, count / elapsed if elapsed else 0.0))
+
+
+if __name__ == "__main__":
+    main()
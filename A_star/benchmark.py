@@ -0,0 +1,245 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from batch import list_boards
+from board import load_board
+from frontier import FRONTIERS
+from jps import uniform_cost
+from main import SEARCHES, shortest_path, solve
+
+# Searches that may return a path above the optimal cost by design, so a
+# higher cost than dijkstra's is reported but not counted as a failure
+APPROXIMATE = ('hpa_star',)
+# Searches that ignore the terrain costs. Their costs are only checked on
+# boards where every open cell costs the same, and jps only runs there.
+UNWEIGHTED = ('bfs', 'jps')
+# Terrain of the synthetic boards, roads the most common
+TERRAIN = 'rrrrggffmw#'
+
+
+# Best wall time of a few runs of a search on an already loaded board
+def time_search(board, prioritize, frontier, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = shortest_path(board, prioritize, frontier=frontier)
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+# Compares the frontiers of shortest_path on every board
+def compare_frontiers(paths, frontiers, compact=False, repeat=5):
+    print("%-48s %-8s %-8s %10s %9s %8s" %
+          ('board', 'search', 'frontier', 'time (ms)', 'expanded', 'speedup'))
+    for board_path in list_boards(paths):
+        board = load_board(board_path, compact)
+        for prioritize in (True, False):
+            search = 'a_star' if prioritize else 'dijkstra'
+            baseline = None
+            for frontier in frontiers:
+                elapsed, result = time_search(board, prioritize, frontier,
+                                              repeat)
+                if baseline is None:
+                    baseline = elapsed
+                print("%-48s %-8s %-8s %10.2f %9d %7.2fx" %
+                      (board_path[-48:], search, frontier, elapsed * 1000,
+                       result.expanded, baseline / elapsed))
+
+
+# Writes a random board of size x size cells (the same one for the same
+# size and seed) and returns its file name. A is in the top left corner
+# and B in the bottom right one, and a random walk between them is kept
+# free of walls so B can always be reached.
+def synthetic_board(size, seed=0, directory=None):
+    if directory is None:
+        directory = os.path.join(tempfile.gettempdir(), 'astar-synthetic')
+    os.makedirs(directory, exist_ok=True)
+    filename = os.path.join(directory,
+                            'synthetic-%d-%d.txt' % (size, seed))
+    if os.path.exists(filename):
+        return filename
+    rng = random.Random(seed * 100003 + size)
+    rows = [[rng.choice(TERRAIN) for _ in range(size)] for _ in range(size)]
+    x, y = 0, 0
+    while (x, y) != (size - 1, size - 1):
+        if rows[y][x] == '#':
+            rows[y][x] = 'r'
+        if y == size - 1 or (x < size - 1 and rng.random() < 0.5):
+            x += 1
+        else:
+            y += 1
+    rows[0][0] = 'A'
+    rows[-1][-1] = 'B'
+    with open(filename, 'w') as f:
+        for row in rows:
+            f.write(''.join(row) + '\n')
+    return filename
+
+
+# Measures one search on a board: the best wall time of a few runs, then
+# one more run under tracemalloc for the peak memory it allocates. The
+# search asked for is the one measured, never Jump Point Search instead.
+def measure(board_path, algorithm, compact, repeat):
+    # loads and caches the board
+    solve(board_path, algorithm, compact, auto_jps=False)
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = solve(board_path, algorithm, compact, auto_jps=False)
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best:
+            best = elapsed
+    tracemalloc.start()
+    solve(board_path, algorithm, compact, auto_jps=False)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'time': best,
+        'expanded': result.expanded,
+        'peak_memory': peak,
+        'cost': result.cost,
+    }
+
+
+# Runs every algorithm on every board, and checks the costs against
+# dijkstra's. Returns {"board|algorithm": measurement}, where each
+# measurement also says if its path was "optimal" (None if unchecked).
+def run_suite(boards, algorithms, compact=False, repeat=3):
+    measurements = {}
+    print("%-44s %-22s %10s %9s %10s %8s" %
+          ('board', 'algorithm', 'time (ms)', 'expanded', 'peak (KiB)',
+           'cost'))
+    for board_path in boards:
+        optimum = solve(board_path, 'dijkstra', compact).cost
+        uniform = uniform_cost(load_board(board_path, compact, cached=True))
+        for algorithm in algorithms:
+            if algorithm == 'jps' and not uniform:
+                continue
+            measurement = measure(board_path, algorithm, compact, repeat)
+            if algorithm in UNWEIGHTED and not uniform:
+                measurement['optimal'] = None
+            else:
+                measurement['optimal'] = measurement['cost'] == optimum
+            measurements[board_path + '|' + algorithm] = measurement
+            note = ''
+            if measurement['optimal'] is False:
+                note = ' (optimal %s)' % optimum
+            print("%-44s %-22s %10.2f %9d %10.1f %8s%s" %
+                  (board_path[-44:], algorithm, measurement['time'] * 1000,
+                   measurement['expanded'],
+                   measurement['peak_memory'] / 1024.0,
+                   measurement['cost'], note))
+    return measurements
+
+
+# Compares measurements against stored baselines. A search regressed if
+# it got slower or used more memory by more than the tolerance, or
+# expanded more nodes. Slowdowns under min_time seconds are taken as
+# noise. Returns the regressions as readable lines.
+def find_regressions(measurements, baselines, tolerance=0.25,
+                     min_time=0.001):
+    regressions = []
+    for key, measurement in sorted(measurements.items()):
+        baseline = baselines.get(key)
+        if baseline is None:
+            continue
+        for field in ('time', 'peak_memory'):
+            if field == 'time' and \
+                    measurement['time'] - baseline['time'] < min_time:
+                continue
+            if measurement[field] > baseline[field] * (1 + tolerance):
+                regressions.append('%s: %s %.6g -> %.6g' %
+                                   (key, field, baseline[field],
+                                    measurement[field]))
+        if measurement['expanded'] > baseline['expanded']:
+            regressions.append('%s: expanded %d -> %d' %
+                               (key, baseline['expanded'],
+                                measurement['expanded']))
+    return regressions
+
+
+# argparse type of the counts that have to be at least 1
+def positive_int(text):
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError("must be at least 1")
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmarks the searches on every board, checking their '
+                    'costs against dijkstra and optionally against stored '
+                    'baselines.')
+    parser.add_argument('paths', nargs='*',
+                        default=['boards', 'trondheim', 'harstad', 'sverige'],
+                        help='board directories or files')
+    parser.add_argument('-a', '--algorithm', action='append',
+                        choices=sorted(SEARCHES),
+                        help='algorithm to run (repeatable, default all)')
+    parser.add_argument('--compact', action='store_true',
+                        help='use the compact GridBoard')
+    parser.add_argument('-r', '--repeat', type=positive_int, default=3,
+                        help='runs per search, the best one is reported')
+    parser.add_argument('-s', '--synthetic', type=int, action='append',
+                        metavar='SIZE',
+                        help='also run on a generated SIZE x SIZE board '
+                             '(repeatable)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the generated boards')
+    parser.add_argument('--save-baseline', metavar='FILE',
+                        help='write the measurements to a baseline file')
+    parser.add_argument('--baseline', metavar='FILE',
+                        help='flag regressions against a baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown and memory growth against '
+                             'the baseline (default 0.25, 25%%)')
+    parser.add_argument('--frontiers', action='store_true',
+                        help='compare the frontiers of a_star and dijkstra '
+                             'instead')
+    args = parser.parse_args(argv)
+    if args.frontiers:
+        compare_frontiers(args.paths, list(FRONTIERS), args.compact,
+                          args.repeat)
+        return 0
+
+    boards = list_boards(args.paths)
+    for size in args.synthetic or []:
+        boards.append(synthetic_board(size, args.seed))
+    algorithms = args.algorithm or sorted(SEARCHES)
+    measurements = run_suite(boards, algorithms, args.compact, args.repeat)
+    status = 0
+    wrong = [key for key, measurement in sorted(measurements.items())
+             if measurement['optimal'] is False and
+             key.split('|')[1] not in APPROXIMATE]
+    for key in wrong:
+        print("Not optimal: " + key)
+        status = 1
+    if args.baseline:
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+        regressions = find_regressions(measurements, baselines,
+                                       args.tolerance)
+        for line in regressions:
+            print("Regression: " + line)
+        if regressions:
+            status = 1
+        else:
+            print("No regressions against " + args.baseline)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(measurements, f, indent=1, sort_keys=True)
+        print("Wrote " + args.save_baseline)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
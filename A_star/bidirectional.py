@@ -0,0 +1,113 @@
+from heapq import heappop, heappush
+
+from board import load_board, query_nodes
+from result import make_result
+from stats import finish, instrument
+
+
+# Drops the entries of nodes that are already expanded from the top of a
+# heap, so heap[0] is the real lowest priority of that side.
+def clean_top(heap, closed, stats=None):
+    while heap and heap[0][1] in closed:
+        heappop(heap)
+        if stats is not None:
+            stats.stale += 1
+
+
+# Bidirectional A* (or Dijkstra without the heuristic). A forward search
+# from the start and a backward search from the goal run in turns, always
+# growing the side with the smaller frontier.
+#
+# Entering a node costs board.cost(node), so the backward search pays for
+# the node it leaves: g_back(n) is the cost of the path from n to the
+# goal, not counting n itself.
+#
+# mu is the cost of the best path found so far through a node that both
+# searches have reached. Dijkstra stops when the two lowest priorities
+# add up to at least mu. With the (consistent) Manhattan heuristic every
+# better path would have to pass a frontier node with f below mu, so A*
+# stops as soon as either side's lowest f reaches mu.
+def bidirectional_search(board_name, prioritize=False, start=None,
+                         goal=None, stats=None):
+    board = instrument(load_board(board_name), stats)
+    start, goal = query_nodes(board, start, goal)
+    algorithm = 'bidirectional_' + ('a_star' if prioritize else 'dijkstra')
+
+    # Index 0 is the forward search, index 1 the backward search
+    targets = (goal, start)
+    heaps = ([(0, start)], [(0, goal)])
+    if stats is not None:
+        stats.push(1)
+        stats.push(2)
+    g = ({start: 0}, {goal: 0})
+    came_from = ({start: None}, {goal: None})
+    closed = (set(), set())
+    considered = []
+    expanded = 0
+    mu = 0 if start == goal else None
+    meeting = start if start == goal else None
+
+    while heaps[0] and heaps[1]:
+        clean_top(heaps[0], closed[0], stats)
+        clean_top(heaps[1], closed[1], stats)
+        if not heaps[0] or not heaps[1]:
+            break
+        if mu is not None:
+            top_forward, top_back = heaps[0][0][0], heaps[1][0][0]
+            if prioritize:
+                if top_forward >= mu or top_back >= mu:
+                    break
+            elif top_forward + top_back >= mu:
+                break
+
+        side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+        other = 1 - side
+        current = heappop(heaps[side])[1]
+        closed[side].add(current)
+        expanded += 1
+
+        g_side, g_other = g[side], g[other]
+        for friend in board.get_neighbors(current):
+            if friend in closed[side]:
+                continue
+            if side == 0:
+                new_cost = g_side[current] + board.cost(friend)
+            else:
+                new_cost = g_side[current] + board.cost(current)
+            if friend not in g_side or new_cost < g_side[friend]:
+                considered.append(friend)
+                g_side[friend] = new_cost
+                came_from[side][friend] = current
+                priority = new_cost
+                if prioritize:
+                    priority += board.heuristic(targets[side], friend)
+                heappush(heaps[side], (priority, friend))
+                if stats is not None:
+                    stats.push(len(heaps[0]) + len(heaps[1]))
+                # A path through friend is known from both sides
+                if friend in g_other:
+                    total = new_cost + g_other[friend]
+                    if mu is None or total < mu:
+                        mu = total
+                        meeting = friend
+
+    # Joins the two halves into one predecessor map towards the goal
+    path_from = dict(came_from[0])
+    if meeting is not None:
+        current = meeting
+        while came_from[1][current] is not None:
+            after = came_from[1][current]
+            path_from[after] = current
+            current = after
+    else:
+        path_from.pop(goal, None)
+    return finish(make_result(board, algorithm, start, goal, path_from,
+                              considered, expanded), stats)
+
+
+def bidirectional_a_star(board_name, start=None, goal=None, stats=None):
+    return bidirectional_search(board_name, True, start, goal, stats)
+
+
+def bidirectional_dijkstra(board_name, start=None, goal=None, stats=None):
+    return bidirectional_search(board_name, False, start, goal, stats)
@@ -0,0 +1,79 @@
+import argparse
+import mmap
+import os
+import struct
+
+# The binary board format: a little endian header with the board size
+# and the start and goal cells (-1 if missing), then one byte per cell,
+# row by row, with the same characters as the text boards.
+MAGIC = b'BRD1'
+HEADER = struct.Struct('<4sIIii')
+BINARY_EXTENSION = '.brd'
+
+
+# Returns if a board file is in the binary format
+def is_binary(filename):
+    with open(filename, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+# Reads a text board into (width, height, terrain bytes)
+def read_text(filename):
+    with open(filename, 'rb') as f:
+        rows = [line.rstrip(b'\r\n') for line in f]
+    rows = [row for row in rows if row]
+    return len(rows[0]), len(rows), b''.join(rows)
+
+
+# Memory maps a binary board and returns (width, height, start, goal,
+# terrain). The terrain is a read only memoryview on the mapped file, so
+# processes that open the same board share its pages.
+def open_binary(filename):
+    with open(filename, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, w, h, start, goal = HEADER.unpack_from(mapped)
+    if magic != MAGIC:
+        raise ValueError(filename + " is not a binary board")
+    terrain = memoryview(mapped)[HEADER.size:HEADER.size + w * h]
+    return w, h, (start if start >= 0 else None), \
+        (goal if goal >= 0 else None), terrain
+
+
+def write_binary(filename, w, h, terrain, start=None, goal=None):
+    with open(filename, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, w, h,
+                            -1 if start is None else start,
+                            -1 if goal is None else goal))
+        f.write(terrain)
+
+
+# Converts a text board to the binary format, next to it by default
+def convert(text_name, binary_name=None):
+    if binary_name is None:
+        binary_name = os.path.splitext(text_name)[0] + BINARY_EXTENSION
+    w, h, terrain = read_text(text_name)
+    start, goal = terrain.find(b'A'), terrain.find(b'B')
+    write_binary(binary_name, w, h, terrain,
+                 start if start >= 0 else None, goal if goal >= 0 else None)
+    return binary_name
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Converts text boards to the binary board format.')
+    parser.add_argument('boards', nargs='+', help='text board files')
+    parser.add_argument('-o', '--output-dir',
+                        help='directory for the binary boards '
+                             '(default: next to the text boards)')
+    args = parser.parse_args(argv)
+    for text_name in args.boards:
+        binary_name = None
+        if args.output_dir:
+            name = os.path.splitext(os.path.basename(text_name))[0]
+            binary_name = os.path.join(args.output_dir,
+                                       name + BINARY_EXTENSION)
+        print("Wrote " + convert(text_name, binary_name))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+from collections import OrderedDict
+import os
+
+import binboard
+
+# Extensions of the board files, text and binary
+BOARD_EXTENSIONS = ('.txt', binboard.BINARY_EXTENSION)
+
+
+class Board:
+    def __init__(self, board_name):
+        self.start = None
+        self.goal = None  # me-irl
+        self.board = board_name
+        self.board_array = []
+        self.read_board()
+        self.board_w = len(self.board_array[0])
+        self.board_h = len(self.board_array)
+
+    # Returns if a given node is a wall (used by neighbour function)
+    def is_wall(self, node):
+        x, y = node
+        return self.board_array[y][x] == '#'
+
+    # Finds every valid neighbour of a node
+    def get_neighbors(self, node):
+        x, y = node
+        l, t, r, b = (x - 1, y), (x, y - 1), (x + 1, y), (x, y + 1)
+        valid_nodes = []
+        for node in [l, t, r, b]:
+            x, y = node
+            if 0 <= x < self.board_w and 0 <= y < self.board_h and not self.is_wall(node):
+                valid_nodes.append(node)
+        return valid_nodes
+
+    # Contains the costs of the different terrains
+    def cost_node(self, x):
+        return {
+            'w': 100,   # Water
+            'm': 50,    # Mountain
+            'f': 10,    # Forest
+            'g': 5,     # Grass
+            'r': 1,     # Road
+        }.get(x, 1)     # Default
+
+    # Finds the cost of a node
+    def cost(self, node):
+        x, y = node
+        return self.cost_node(self.board_array[y][x])
+
+    # Heuristic between two nodes, lets the searches stay node-agnostic
+    def heuristic(self, goal, node):
+        return heuristic(goal, node)
+
+    # Returns the (x, y) position of a node (used when rendering)
+    def coords(self, node):
+        return node
+
+    # Returns the node at an (x, y) position (used for start/goal queries)
+    def to_node(self, position):
+        return tuple(position)
+
+    # Changes the terrain of a cell, like a road ('r') into a wall ('#').
+    # The indexes built from the board follow the change, see cells_changed.
+    def set_cell(self, position, terrain):
+        x, y = position
+        self.board_array[y][x] = terrain
+        cells_changed(self, [position])
+
+    # Reads the board from the provided files, and makes them a 2d array
+    def read_board(self):
+        if binboard.is_binary(self.board):
+            self.read_binary_board()
+            return
+        f = open(self.board)
+        board = []
+        for line in f:
+            board.append([c for c in line if c != '\n'])
+        # detect start and goal
+        for y, row in enumerate(board):
+            if not self.start and 'A' in row:
+                self.start = row.index('A'), y
+            if not self.goal and 'B' in row:
+                self.goal = row.index('B'), y
+
+        self.board_array = board
+        print("Read board of size " + str(len(self.board_array)) +
+              "," + str(len(self.board_array[0])))
+
+    # Reads a board in the binary format (see binboard.py)
+    def read_binary_board(self):
+        w, h, start, goal, terrain = binboard.open_binary(self.board)
+        self.board_array = [list(bytes(terrain[y * w:(y + 1) * w]).decode())
+                            for y in range(h)]
+        self.start = None if start is None else (start % w, start // w)
+        self.goal = None if goal is None else (goal % w, goal // w)
+        print("Read board of size " + str(h) + "," + str(w))
+
+    # Shows the board as an image, or saves it if a file name is given
+    def save_image_board(self, filename=None, cell_size=20):
+        from renderimage import ImageRender
+
+        img = ImageRender(self, cell_size).to_pil()
+        if filename is None:
+            img.show()
+        else:
+            img.save(filename)
+
+
+# Compact grid mode of the board. The terrain is kept in a flat buffer and
+# nodes are integer ids (y * width + x) instead of (x, y) tuples. The cost
+# array is computed once, and the neighbours of a cell the first time they
+# are asked for, so get_neighbors and cost are plain lookups during the
+# search. Binary boards are memory mapped instead of read, and their
+# terrain is shared between the processes that open them.
+class GridBoard(Board):
+    def __init__(self, board_name):
+        self.start = None
+        self.goal = None
+        self.board = board_name
+        self.terrain = bytearray()
+        self.costs = bytes()
+        self.neighbors = []
+        self.board_w = 0
+        self.board_h = 0
+        self.read_board()
+
+    # The rows of the board as lists of characters (used by the renderer)
+    @property
+    def board_array(self):
+        w = self.board_w
+        return [list(bytes(self.terrain[i:i + w]).decode())
+                for i in range(0, len(self.terrain), w)]
+
+    def is_wall(self, node):
+        return self.terrain[node] == ord('#')
+
+    def get_neighbors(self, node):
+        neighbors = self.neighbors[node]
+        if neighbors is None:
+            neighbors = self.neighbors[node] = self.find_neighbors(node)
+        return neighbors
+
+    def cost(self, node):
+        return self.costs[node]
+
+    def heuristic(self, goal, node):
+        w = self.board_w
+        return abs(node % w - goal % w) + abs(node // w - goal // w)
+
+    def coords(self, node):
+        return node % self.board_w, node // self.board_w
+
+    def to_node(self, position):
+        x, y = position
+        return self.node(x, y)
+
+    # Converts an (x, y) position to a node id
+    def node(self, x, y):
+        return y * self.board_w + x
+
+    def set_cell(self, position, terrain):
+        # A mapped binary board is read only, so it gets copied first
+        if not isinstance(self.terrain, bytearray):
+            self.terrain = bytearray(self.terrain)
+        if not isinstance(self.costs, bytearray):
+            self.costs = bytearray(self.costs)
+        node = self.to_node(position)
+        self.terrain[node] = ord(terrain)
+        self.costs[node] = self.cost_node(terrain)
+        # The cell and its neighbours get their neighbours found again
+        for n in (node - self.board_w, node - 1, node, node + 1,
+                  node + self.board_w):
+            if 0 <= n < len(self.neighbors):
+                self.neighbors[n] = None
+        cells_changed(self, [position])
+
+    # Reads the board straight into the flat terrain buffer, or maps it if
+    # it is a binary board
+    def read_board(self):
+        if binboard.is_binary(self.board):
+            w, h, self.start, self.goal, self.terrain = \
+                binboard.open_binary(self.board)
+        else:
+            w, h, terrain = binboard.read_text(self.board)
+            self.terrain = bytearray(terrain)
+            start, goal = terrain.find(b'A'), terrain.find(b'B')
+            self.start = start if start >= 0 else None
+            self.goal = goal if goal >= 0 else None
+        self.board_w, self.board_h = w, h
+        self.build_tables()
+        print("Read board of size " + str(h) + "," + str(w))
+
+    # Maps every cell through a 256 byte table (like the terrain costs)
+    def map_terrain(self, table):
+        return bytes(self.terrain).translate(table)
+
+    # Builds the cost array. The neighbour table starts out empty.
+    def build_tables(self):
+        cost_table = bytes(self.cost_node(chr(c)) for c in range(256))
+        self.costs = self.map_terrain(cost_table)
+        self.neighbors = [None] * len(self.terrain)
+
+    # The open neighbours of a cell, in the same order as
+    # Board.get_neighbors: left, top, right, bottom
+    def find_neighbors(self, i):
+        w = self.board_w
+        terrain = self.terrain
+        wall = ord('#')
+        if terrain[i] == wall:
+            return ()
+        candidates = []
+        if i % w > 0:
+            candidates.append(i - 1)
+        if i >= w:
+            candidates.append(i - w)
+        if i % w < w - 1:
+            candidates.append(i + 1)
+        if i < len(terrain) - w:
+            candidates.append(i + w)
+        return tuple(n for n in candidates if terrain[n] != wall)
+
+
+# Keeps parsed boards around so repeated queries on the same map only pay
+# the parse cost once. Boards are keyed by path and mode, and reloaded if
+# the file has been modified. The least recently used board is evicted
+# when there are more than max_size boards.
+class BoardCache:
+    def __init__(self, max_size=16):
+        self.max_size = max_size
+        self.boards = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, board_name, compact=False):
+        key = os.path.abspath(board_name), compact
+        mtime = os.stat(board_name).st_mtime_ns
+        entry = self.boards.get(key)
+        if entry is not None and entry[0] == mtime:
+            self.hits += 1
+            self.boards.move_to_end(key)
+            return entry[1]
+        self.misses += 1
+        board = GridBoard(board_name) if compact else Board(board_name)
+        self.boards[key] = mtime, board
+        self.boards.move_to_end(key)
+        while len(self.boards) > self.max_size:
+            self.boards.popitem(last=False)
+        return board
+
+    # Drops a board object from the cache, after it has been edited
+    def evict(self, board):
+        for key, (_, cached) in list(self.boards.items()):
+            if cached is board:
+                del self.boards[key]
+
+    def clear(self):
+        self.boards.clear()
+
+
+# The process-wide board cache
+board_cache = BoardCache()
+
+# Functions called as hook(board, positions) after cells of a board have
+# changed, so that the indexes built from the board (the HPA* abstraction,
+# the landmark index) can follow. The modules that keep such indexes add
+# their hook here.
+edit_hooks = []
+
+
+# Called by set_cell. An edited board no longer matches its file, so it is
+# dropped from the board cache: later loads of the path read the file again
+# instead of seeing the edits.
+def cells_changed(board, positions):
+    board_cache.evict(board)
+    for hook in edit_hooks:
+        hook(board, positions)
+
+
+# Accepts either a board file name or an already loaded board
+def load_board(board_name, compact=False, cached=False):
+    if isinstance(board_name, Board):
+        return board_name
+    if cached:
+        return board_cache.get(board_name, compact)
+    if compact:
+        return GridBoard(board_name)
+    return Board(board_name)
+
+
+# Heuristic used by astar algo
+def heuristic(goal, curr):
+    # Manhattan distance to goal
+    x_diff = abs(curr[0] - goal[0])
+    y_diff = abs(curr[1] - goal[1])
+    return x_diff + y_diff
+
+
+# Start and goal of a query as nodes of the board. Positions are (x, y)
+# and default to the A and B of the board.
+def query_nodes(board, start=None, goal=None):
+    start = board.start if start is None else board.to_node(start)
+    goal = board.goal if goal is None else board.to_node(goal)
+    return start, goal
@@ -0,0 +1,16 @@
+# Cell colours as (r, g, b), by terrain character. 'v' is the colour of
+# the path and 'c' of the considered nodes. Shared by the Tk renderer and
+# the image renderer, so this module imports nothing.
+COLORS = {
+    'w': (73, 216, 245),  # Water
+    'm': (99, 99, 99),  # Mountain
+    'f': (3, 82, 0),  # Forest
+    'g': (50, 200, 50),  # Grass
+    'r': (114, 80, 41),  # Road
+    '.': (255, 255, 255),  # Nothing
+    '#': (114, 114, 114),  # Wall
+    'A': (90, 180, 90),  # Start
+    'B': (255, 90, 90),  # End
+    'v': (255, 0, 0),
+    'c': (150, 150, 150)
+}
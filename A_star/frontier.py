@@ -0,0 +1,96 @@
+from heapq import heappop, heappush
+from queue import PriorityQueue
+
+
+# The original frontier, a thread-safe PriorityQueue. Nodes get pushed
+# again whenever their cost improves, and the stale entries are expanded
+# again when they are popped.
+class QueueFrontier:
+    def __init__(self):
+        self.queue = PriorityQueue()
+        self.stale = 0
+
+    def __len__(self):
+        return self.queue.qsize()
+
+    def push(self, priority, node):
+        self.queue.put((priority, node))
+
+    def pop(self):
+        return self.queue.get()[1]
+
+
+# Binary heap with lazy deletion. Only the latest priority of a node is
+# live, older entries are skipped (and counted) when they are popped.
+class HeapFrontier:
+    def __init__(self):
+        self.heap = []
+        self.priorities = {}
+        self.stale = 0
+
+    def __len__(self):
+        return len(self.priorities)
+
+    def push(self, priority, node):
+        self.priorities[node] = priority
+        heappush(self.heap, (priority, node))
+
+    def pop(self):
+        heap = self.heap
+        priorities = self.priorities
+        while True:
+            priority, node = heappop(heap)
+            if priorities.get(node) == priority:
+                del priorities[node]
+                return node
+            self.stale += 1
+
+
+# Bucket queue (Dial's algorithm) for small integer priorities. Nodes are
+# kept in one bucket per priority, and the lowest bucket is found by
+# moving a cursor upwards. Terrain costs are small integers, so the
+# buckets are dense and push/pop are O(1). Stale entries are skipped the
+# same way as in HeapFrontier.
+class BucketFrontier:
+    def __init__(self):
+        self.buckets = {}
+        self.priorities = {}
+        self.current = 0
+        self.stale = 0
+
+    def __len__(self):
+        return len(self.priorities)
+
+    def push(self, priority, node):
+        self.priorities[node] = priority
+        bucket = self.buckets.get(priority)
+        if bucket is None:
+            self.buckets[priority] = [node]
+        else:
+            bucket.append(node)
+        # Only needed if the priorities are not monotone
+        if priority < self.current:
+            self.current = priority
+
+    def pop(self):
+        buckets = self.buckets
+        priorities = self.priorities
+        while True:
+            bucket = buckets.get(self.current)
+            if not bucket:
+                if bucket is not None:
+                    del buckets[self.current]
+                self.current += 1
+                continue
+            node = bucket.pop()
+            if priorities.get(node) == self.current:
+                del priorities[node]
+                return node
+            self.stale += 1
+
+
+FRONTIERS = {
+    'queue': QueueFrontier,
+    'heap': HeapFrontier,
+    'bucket': BucketFrontier,
+}
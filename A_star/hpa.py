@@ -0,0 +1,325 @@
+from heapq import heappop, heappush
+from itertools import groupby
+from operator import itemgetter
+from weakref import WeakKeyDictionary
+
+from board import edit_hooks, load_board, query_nodes
+from result import make_result
+from stats import finish, instrument
+
+
+# Shortest paths from a node to the cells of one cluster, without leaving
+# it. Stops early once target is expanded. Returns (costs, came_from,
+# expanded count).
+def local_search(board, source, bounds, target=None):
+    x0, y0, x1, y1 = bounds
+    cost_so_far = {source: 0}
+    came_from = {source: None}
+    frontier = [(0, source)]
+    expanded = 0
+    while frontier:
+        cost, current = heappop(frontier)
+        if cost > cost_so_far[current]:
+            continue
+        if current == target:
+            break
+        expanded += 1
+        for friend in board.get_neighbors(current):
+            x, y = board.coords(friend)
+            if not (x0 <= x < x1 and y0 <= y < y1):
+                continue
+            new_cost = cost + board.cost(friend)
+            if friend not in cost_so_far or new_cost < cost_so_far[friend]:
+                cost_so_far[friend] = new_cost
+                came_from[friend] = current
+                heappush(frontier, (new_cost, friend))
+    return cost_so_far, came_from, expanded
+
+
+# HPA* abstraction of a board. The board is split into square clusters,
+# and the open cell pairs along every border between two clusters are
+# grouped into entrances, split where the terrain changes. Each entrance
+# gets one or more transitions: a pair of cells, one on each side, that
+# become nodes of the abstract graph. The abstract edges are the steps
+# across transitions and the shortest paths between the nodes of one
+# cluster, using the terrain costs of the board.
+#
+# entrance_step trades path quality for speed. By default an entrance
+# gets a transition in its middle, or one at each end if it is long (as
+# in the HPA* paper). With a step, there is a transition every step cells
+# along an entrance; with step 1 every border cell is a node and the
+# paths are optimal.
+class HierarchicalGraph:
+    def __init__(self, board, cluster_size=10, entrance_step=None):
+        self.board = board
+        self.size = cluster_size
+        self.entrance_step = entrance_step
+        self.columns = -(-board.board_w // cluster_size)
+        self.rows = -(-board.board_h // cluster_size)
+        # (cluster, cluster) -> transitions as (cell, cell) pairs
+        self.borders = {}
+        # cluster -> node -> [(node, cost)] inside the cluster
+        self.intra = {}
+        # node -> nodes on the other side of its transitions
+        self.inter = {}
+        self.build_count = 0
+        clusters = [(cx, cy) for cy in range(self.rows)
+                    for cx in range(self.columns)]
+        for cluster in clusters:
+            for other in self.next_clusters(cluster):
+                if other > cluster:
+                    self.build_border(cluster, other)
+        for cluster in clusters:
+            self.build_cluster(cluster)
+
+    def cluster_of(self, node):
+        x, y = self.board.coords(node)
+        return x // self.size, y // self.size
+
+    # The cells of a cluster as (x0, y0, x1, y1), x1 and y1 excluded
+    def bounds(self, cluster):
+        cx, cy = cluster
+        k = self.size
+        return (cx * k, cy * k, min((cx + 1) * k, self.board.board_w),
+                min((cy + 1) * k, self.board.board_h))
+
+    # The clusters right of and below a cluster (and left and above)
+    def next_clusters(self, cluster):
+        cx, cy = cluster
+        for nx, ny in ((cx - 1, cy), (cx, cy - 1), (cx + 1, cy),
+                       (cx, cy + 1)):
+            if 0 <= nx < self.columns and 0 <= ny < self.rows:
+                yield nx, ny
+
+    def is_open(self, x, y):
+        return not self.board.is_wall(self.board.to_node((x, y)))
+
+    # Where along an entrance of a given length the transitions go
+    def transition_offsets(self, length):
+        if self.entrance_step:
+            offsets = list(range(0, length, self.entrance_step))
+            if offsets[-1] != length - 1:
+                offsets.append(length - 1)
+            return offsets
+        if length < 6:
+            return [length // 2]
+        return [0, length - 1]
+
+    # Finds the entrances along the border of two clusters
+    def build_border(self, a, b):
+        x0, y0, x1, y1 = self.bounds(a)
+        to_node = self.board.to_node
+        if b[0] > a[0]:
+            # b is right of a, the border is the column x1 - 1 | x1
+            pairs = [((x1 - 1, y), (x1, y)) for y in range(y0, y1)]
+        else:
+            # b is below a, the border is the row y1 - 1 | y1
+            pairs = [((x, y1 - 1), (x, y1)) for x in range(x0, x1)]
+        # Runs of open pairs with the same terrain on both sides are the
+        # entrances. Splitting on terrain gives e.g. a road that crosses
+        # the border its own transition.
+        keys = []
+        for cell_a, cell_b in pairs:
+            if self.is_open(*cell_a) and self.is_open(*cell_b):
+                node_a, node_b = to_node(cell_a), to_node(cell_b)
+                terrain = self.board.cost(node_a), self.board.cost(node_b)
+                keys.append((terrain, (node_a, node_b)))
+            else:
+                keys.append((None, None))
+        transitions = []
+        for terrain, run in groupby(keys, key=itemgetter(0)):
+            if terrain is not None:
+                run = [pair for _, pair in run]
+                for offset in self.transition_offsets(len(run)):
+                    transitions.append(run[offset])
+        self.borders[a, b] = transitions
+
+    def transitions_of(self, cluster):
+        for other in self.next_clusters(cluster):
+            key = (cluster, other) if cluster < other else (other, cluster)
+            for node_a, node_b in self.borders[key]:
+                if cluster < other:
+                    yield node_a, node_b
+                else:
+                    yield node_b, node_a
+
+    # Finds the nodes of a cluster, their transitions and the costs between
+    # them inside the cluster
+    def build_cluster(self, cluster):
+        self.build_count += 1
+        nodes = []
+        for node, partner in self.transitions_of(cluster):
+            if node not in nodes:
+                nodes.append(node)
+            self.inter.setdefault(node, [])
+            if partner not in self.inter[node]:
+                self.inter[node].append(partner)
+        bounds = self.bounds(cluster)
+        edges = {}
+        for node in nodes:
+            costs = local_search(self.board, node, bounds)[0]
+            edges[node] = [(other, costs[other]) for other in nodes
+                           if other != node and other in costs]
+        self.intra[cluster] = edges
+
+    # Rebuilds the abstraction around changed cells. The borders of the
+    # clusters that contain them are found again, and every cluster next
+    # to one of those borders gets its nodes and costs rebuilt.
+    def update(self, cells):
+        changed = {(x // self.size, y // self.size) for x, y in cells}
+        refresh = set(changed)
+        for cluster in changed:
+            for other in self.next_clusters(cluster):
+                refresh.add(other)
+                key = (cluster, other) if cluster < other else \
+                    (other, cluster)
+                self.build_border(*key)
+        for cluster in refresh:
+            for node in self.intra.get(cluster, {}):
+                self.inter.pop(node, None)
+        for cluster in refresh:
+            self.build_cluster(cluster)
+
+    # Abstract edges of a node: (node, cost, cluster to refine it in). The
+    # cluster is None for steps across a transition.
+    def edges(self, node):
+        cluster = self.cluster_of(node)
+        for other, cost in self.intra[cluster].get(node, ()):
+            yield other, cost, cluster
+        for other in self.inter.get(node, ()):
+            yield other, self.board.cost(other), None
+
+
+# Abstractions built so far, per board object and settings
+_graphs = WeakKeyDictionary()
+
+
+# The cached abstraction of a board, built on first use
+def abstraction_for(board, cluster_size=10, entrance_step=None):
+    graphs = _graphs.setdefault(board, {})
+    key = cluster_size, entrance_step
+    if key not in graphs:
+        graphs[key] = HierarchicalGraph(board, cluster_size, entrance_step)
+    return graphs[key]
+
+
+# Updates the cached abstractions of an edited board around the changed
+# cells, see HierarchicalGraph.update
+def update_abstractions(board, positions):
+    for graph in _graphs.get(board, {}).values():
+        graph.update(positions)
+
+
+edit_hooks.append(update_abstractions)
+
+
+# Path inside a cluster from the predecessors of a local search
+def local_path(came_from, target):
+    path = [target]
+    while came_from[path[-1]] is not None:
+        path.append(came_from[path[-1]])
+    path.reverse()
+    return path
+
+
+# HPA* search. The start and goal are connected to the nodes of their
+# clusters, the route is found on the abstract graph, and only the
+# abstract edges on that route are refined into cells. The cost is at
+# most a little above the optimal one (see HierarchicalGraph). The stats
+# count the pushes of the abstract search, and time the board calls of
+# every search but the one that builds the abstraction.
+def hierarchical_search(board_name, start=None, goal=None, cluster_size=10,
+                        entrance_step=None, stats=None):
+    board = load_board(board_name)
+    start, goal = query_nodes(board, start, goal)
+    graph = abstraction_for(board, cluster_size, entrance_step)
+    board = instrument(board, stats)
+    start_cluster = graph.cluster_of(start)
+    goal_cluster = graph.cluster_of(goal)
+
+    # Costs from the start to the nodes of its cluster
+    from_start, start_came_from, expanded = local_search(
+        board, start, graph.bounds(start_cluster))
+    # Costs from the nodes of the goal's cluster to the goal. Paths can be
+    # walked both ways, and d(n, goal) = d(goal, n) - cost(n) + cost(goal)
+    from_goal, goal_came_from, goal_expanded = local_search(
+        board, goal, graph.bounds(goal_cluster))
+    expanded += goal_expanded
+    goal_cost = board.cost(goal)
+    to_goal = {node: from_goal[node] - board.cost(node) + goal_cost
+               for node in graph.intra[goal_cluster] if node in from_goal}
+
+    # A* on the abstract graph. Abstract nodes are the board nodes of the
+    # transitions, plus start and goal. An abstract edge is never shorter
+    # than the Manhattan distance, so the heuristic stays consistent.
+    cost_so_far = {start: 0}
+    came_from = {start: None}
+    frontier = [(0, start)]
+    closed = set()
+    considered = []
+    if stats is not None:
+        stats.push(1)
+    if start_cluster == goal_cluster and goal in from_start and \
+            goal != start:
+        cost_so_far[goal] = from_start[goal]
+        came_from[goal] = (start, start_cluster)
+        heappush(frontier, (from_start[goal], goal))
+        if stats is not None:
+            stats.push(2)
+    while frontier:
+        current = heappop(frontier)[1]
+        if current in closed:
+            if stats is not None:
+                stats.stale += 1
+            continue
+        if current == goal:
+            break
+        closed.add(current)
+        expanded += 1
+        if current == start:
+            edges = [(node, from_start[node], start_cluster)
+                     for node in graph.intra[start_cluster]
+                     if node in from_start and node != start]
+            if start in graph.inter:
+                edges += list(graph.edges(start))
+        else:
+            edges = list(graph.edges(current))
+        if current in to_goal:
+            edges.append((goal, to_goal[current], goal_cluster))
+        for friend, step, cluster in edges:
+            new_cost = cost_so_far[current] + step
+            if friend not in cost_so_far or new_cost < cost_so_far[friend]:
+                considered.append(friend)
+                cost_so_far[friend] = new_cost
+                came_from[friend] = (current, cluster)
+                priority = new_cost + board.heuristic(goal, friend)
+                heappush(frontier, (priority, friend))
+                if stats is not None:
+                    stats.push(len(frontier))
+
+    # Refines the abstract route into cells, one edge at a time
+    path_from = {start: None}
+    if goal in came_from:
+        route = [goal]
+        while came_from[route[-1]] is not None:
+            route.append(came_from[route[-1]][0])
+        route.reverse()
+        path = [start]
+        for before, after in zip(route, route[1:]):
+            cluster = came_from[after][1]
+            if cluster is None:
+                path.append(after)
+            elif before == start:
+                path += local_path(start_came_from, after)[1:]
+            elif after == goal:
+                # The goal's search runs from the goal, so walk it back
+                path += local_path(goal_came_from, before)[::-1][1:]
+            else:
+                came, local_expanded = local_search(
+                    board, before, graph.bounds(cluster), after)[1:]
+                expanded += local_expanded
+                path += local_path(came, after)[1:]
+        for before, after in zip(path, path[1:]):
+            path_from[after] = before
+    return finish(make_result(board, 'hpa_star', start, goal, path_from,
+                              considered, expanded), stats)
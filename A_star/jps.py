@@ -0,0 +1,265 @@
+from heapq import heappop, heappush
+from weakref import WeakKeyDictionary
+
+from board import GridBoard, edit_hooks, load_board, query_nodes
+from result import make_result
+from stats import finish
+
+# The uniform cost and the jump tables of the boards seen so far, dropped
+# when a cell of the board is edited
+_uniform = WeakKeyDictionary()
+_tables = WeakKeyDictionary()
+
+
+# The terrain cost shared by every open cell, or None if the costs differ.
+# Worked out once per board.
+def uniform_cost(board):
+    if board not in _uniform:
+        if isinstance(board, GridBoard):
+            terrains = {chr(c) for c in set(board.terrain)}
+        else:
+            terrains = set().union(*board.board_array)
+        costs = {board.cost_node(c) for c in terrains if c != '#'}
+        _uniform[board] = costs.pop() if len(costs) == 1 else None
+    return _uniform[board]
+
+
+# The walls of a board and where the jumps from every cell end, which do
+# not depend on the query. The cells are indexed in a copy of the board
+# with a border of walls around it, so that width is the board width + 2
+# and the jumps never need a bounds check.
+#
+# horizontal[dx][p] is the first cell after p in direction dx (-1 or 1)
+# that has a forced vertical neighbour, and vertical[dy][p] the first cell
+# after p in direction dy from which a horizontal jump finds such a cell,
+# or 0 if a wall comes first. row_run and column_run number the runs of
+# open cells in the rows and columns, so that whether the goal can be
+# reached in a straight line is a lookup too.
+class JumpTables:
+    def __init__(self, board):
+        w, h = board.board_w, board.board_h
+        self.width = width = w + 2
+        size = width * (h + 2)
+        self.open = passable = bytearray(size)
+        if isinstance(board, GridBoard):
+            walls = bytes(0 if c == ord('#') else 1 for c in range(256))
+            cells = board.map_terrain(walls)
+            for y in range(h):
+                row = (y + 1) * width + 1
+                passable[row:row + w] = cells[y * w:(y + 1) * w]
+        else:
+            for y, cells in enumerate(board.board_array):
+                row = (y + 1) * width + 1
+                passable[row:row + w] = bytes(c != '#' for c in cells)
+
+        # A vertical neighbour of a cell is forced when the cell behind it
+        # is a wall, so it can't be reached vertically first
+        def forced(q, dx):
+            return passable[q - width] and not passable[q - width - dx] or \
+                passable[q + width] and not passable[q + width - dx]
+
+        self.horizontal = {}
+        for dx in (-1, 1):
+            jumps = [0] * size
+            xs = range(w, 0, -1) if dx == 1 else range(1, w + 1)
+            for y in range(1, h + 1):
+                for x in xs:
+                    p = y * width + x
+                    q = p + dx
+                    if not passable[q]:
+                        continue
+                    jumps[p] = q if forced(q, dx) else jumps[q]
+            self.horizontal[dx] = jumps
+        left, right = self.horizontal[-1], self.horizontal[1]
+        self.vertical = {}
+        for dy in (-1, 1):
+            jumps = [0] * size
+            step = dy * width
+            ys = range(h, 0, -1) if dy == 1 else range(1, h + 1)
+            for y in ys:
+                for x in range(1, w + 1):
+                    p = y * width + x
+                    q = p + step
+                    if not passable[q]:
+                        continue
+                    jumps[p] = q if left[q] or right[q] else jumps[q]
+            self.vertical[dy] = jumps
+
+        self.row_run = [0] * size
+        run = 0
+        for p in range(size):
+            if passable[p]:
+                if not passable[p - 1]:
+                    run += 1
+                self.row_run[p] = run
+        self.column_run = [0] * size
+        for x in range(1, w + 1):
+            for p in range(width + x, size, width):
+                if passable[p]:
+                    if not passable[p - width]:
+                        run += 1
+                    self.column_run[p] = run
+
+
+# The jump tables of a board, built on first use
+def tables_for(board):
+    if board not in _tables:
+        _tables[board] = JumpTables(board)
+    return _tables[board]
+
+
+# Drops what is known of an edited board
+def forget_tables(board, positions):
+    _uniform.pop(board, None)
+    _tables.pop(board, None)
+
+
+edit_hooks.append(forget_tables)
+
+
+# Jump Point Search for the 4-connected boards, where every open cell has
+# the same cost. Of all the equally short paths only the canonical ones
+# are searched: those that turn from horizontal to vertical only when a
+# wall forces it. So a horizontal jump runs until it hits the goal or a
+# cell with a forced vertical neighbour, and a vertical jump stops at any
+# cell from which a horizontal jump finds a jump point. Only the jump
+# points are expanded, and the path is filled in between them at the end.
+# The cells are indexes into the JumpTables of the board, and every jump
+# is a lookup in them, plus a check for the goal.
+class JumpPointSearch:
+    def __init__(self, tables, goal):
+        self.tables = tables
+        self.width = tables.width
+        self.goal = goal
+        self.goal_row = goal // tables.width
+        self.goal_run = tables.row_run[goal]
+
+    def jump_horizontal(self, p, dx):
+        stop = self.tables.horizontal[dx][p]
+        goal = self.goal
+        if (goal - p) * dx > 0 and self.tables.row_run[p] == self.goal_run \
+                and (not stop or (goal - stop) * dx < 0):
+            return goal
+        return stop
+
+    def jump_vertical(self, p, dy):
+        tables = self.tables
+        stop = tables.vertical[dy][p]
+        # The cell of this column in the goal's row stops the jump too, if
+        # the goal can be reached from there
+        crossing = p + (self.goal_row - p // self.width) * self.width
+        if (crossing - p) * dy > 0 and \
+                tables.column_run[crossing] == tables.column_run[p] and \
+                tables.row_run[crossing] == self.goal_run and \
+                (not stop or (crossing - stop) * dy < 0):
+            return crossing
+        return stop
+
+    # The jump points found from a jump point, given how it was reached
+    def successors(self, p, parent):
+        width = self.width
+        if parent is None:
+            jumps = [self.jump_horizontal(p, -1), self.jump_vertical(p, -1),
+                     self.jump_horizontal(p, 1), self.jump_vertical(p, 1)]
+        elif abs(p - parent) >= width:
+            # Reached vertically: keep going, or turn either way
+            dy = 1 if p > parent else -1
+            jumps = [self.jump_vertical(p, dy), self.jump_horizontal(p, -1),
+                     self.jump_horizontal(p, 1)]
+        else:
+            dx = 1 if p > parent else -1
+            jumps = [self.jump_horizontal(p, dx)]
+            passable = self.tables.open
+            for dy in (-1, 1):
+                q = p + dy * width
+                if passable[q] and not passable[q - dx]:
+                    jumps.append(self.jump_vertical(p, dy))
+        return [jump for jump in jumps if jump]
+
+
+# Fills in the cells between consecutive jump points of a path
+def fill_path(jump_points):
+    path = [jump_points[0]]
+    for x, y in jump_points[1:]:
+        px, py = path[-1]
+        dx = (x > px) - (x < px)
+        dy = (y > py) - (y < py)
+        while (px, py) != (x, y):
+            px, py = px + dx, py + dy
+            path.append((px, py))
+    return path
+
+
+# A* over the jump points of a uniform cost board. Returns the same cost
+# as a_star, but expands only the jump points. The board is not timed in
+# the stats, since the jumps read the jump tables of the board instead.
+def jump_point_search(board_name, start=None, goal=None, stats=None):
+    board = load_board(board_name)
+    if stats is not None:
+        stats.start()
+    start, goal = query_nodes(board, start, goal)
+    step_cost = uniform_cost(board) or 1
+    tables = tables_for(board)
+    width = tables.width
+
+    # Positions to cells of the tables and back
+    def cell(node):
+        x, y = board.coords(node)
+        return (y + 1) * width + x + 1
+
+    def position(p):
+        return p % width - 1, p // width - 1
+
+    start_cell, goal_cell = cell(start), cell(goal)
+    goal_x, goal_y = goal_cell % width, goal_cell // width
+    jps = JumpPointSearch(tables, goal_cell)
+
+    # Entries are (priority, distance to the goal, cost, cell): of equal
+    # priorities the one closest to the goal goes first, and an entry whose
+    # cost is above the cell's cost so far is stale
+    frontier = [(0, 0, 0, start_cell)]
+    if stats is not None:
+        stats.push(1)
+    came_from = {start_cell: None}
+    cost_so_far = {start_cell: 0}
+    considered = []
+    expanded = 0
+    successors = jps.successors
+
+    while frontier:
+        _, _, current_cost, current = heappop(frontier)
+        if current_cost > cost_so_far[current]:
+            if stats is not None:
+                stats.stale += 1
+            continue
+        if current == goal_cell:
+            break
+        expanded += 1
+        for friend in successors(current, came_from[current]):
+            steps = abs(friend - current)
+            if steps >= width:
+                steps //= width
+            new_cost = current_cost + steps * step_cost
+            if new_cost < cost_so_far.get(friend, new_cost + 1):
+                considered.append(friend)
+                cost_so_far[friend] = new_cost
+                came_from[friend] = current
+                h = (abs(friend % width - goal_x) +
+                     abs(friend // width - goal_y)) * step_cost
+                heappush(frontier, (new_cost + h, h, new_cost, friend))
+                if stats is not None:
+                    stats.push(len(frontier))
+    considered = [board.to_node(position(p)) for p in considered]
+
+    # Predecessors along the filled in path, as nodes of the board
+    path_from = {start: None}
+    if goal_cell in came_from:
+        jump_points = [goal_cell]
+        while came_from[jump_points[-1]] is not None:
+            jump_points.append(came_from[jump_points[-1]])
+        jump_points = [position(p) for p in reversed(jump_points)]
+        path = [board.to_node(p) for p in fill_path(jump_points)]
+        for before, after in zip(path, path[1:]):
+            path_from[after] = before
+    return finish(make_result(board, 'jps', start, goal, path_from,
+                              considered, expanded), stats)
@@ -0,0 +1,229 @@
+import argparse
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from heapq import heappop, heappush
+
+from board import edit_hooks, load_board
+
+# Marks cells that can't be reached from a landmark
+UNREACHABLE = 0xFFFFFFFF
+MAGIC = b'ALT1'
+HEADER = struct.Struct('<4sIII')
+
+
+# Costs from a node to every cell of the board, indexed by y * width + x.
+# Entering a cell costs board.cost(cell), like in shortest_path.
+def distance_table(board, source):
+    w = board.board_w
+    table = array('I', [UNREACHABLE]) * (w * board.board_h)
+    x, y = board.coords(source)
+    table[y * w + x] = 0
+    frontier = [(0, source)]
+    while frontier:
+        cost, current = heappop(frontier)
+        x, y = board.coords(current)
+        if cost > table[y * w + x]:
+            continue
+        for friend in board.get_neighbors(current):
+            new_cost = cost + board.cost(friend)
+            fx, fy = board.coords(friend)
+            if new_cost < table[fy * w + fx]:
+                table[fy * w + fx] = new_cost
+                heappush(frontier, (new_cost, friend))
+    return table
+
+
+# Distance tables from a few landmarks, used for the ALT heuristic: by the
+# triangle inequality d(L, goal) - d(L, n) <= d(n, goal) and
+# d(n, L) - d(goal, L) <= d(n, goal) for every landmark L. Moving between
+# neighbours is symmetric, and d(n, L) = d(L, n) - cost(n) + cost(L), so
+# one table per landmark covers both directions.
+class LandmarkIndex:
+    def __init__(self, width, height, landmarks, tables, costs):
+        self.width = width
+        self.height = height
+        self.landmarks = landmarks
+        self.tables = tables
+        # Terrain cost per cell, needed to turn d(L, n) into d(n, L)
+        self.costs = costs
+        # Set when the board has been edited, since the distances may no
+        # longer be lower bounds then
+        self.stale = False
+
+    # Picks landmarks by farthest point selection: every new landmark is
+    # the reachable cell farthest from the landmarks picked so far.
+    @classmethod
+    def build(cls, board, count=8):
+        w, h = board.board_w, board.board_h
+        costs = array('I', [0]) * (w * h)
+        seed = board.start
+        for y in range(h):
+            for x in range(w):
+                node = board.to_node((x, y))
+                if not board.is_wall(node):
+                    costs[y * w + x] = board.cost(node)
+                    if seed is None:
+                        seed = node
+        landmarks = []
+        tables = []
+        if seed is None:
+            # Nothing but walls
+            return cls(w, h, landmarks, tables, costs)
+        # The first table only serves to find a far away first landmark. It
+        # starts from the A of the board, or else its first open cell.
+        nearest = distance_table(board, seed)
+        while len(landmarks) < count:
+            best, best_distance = None, 0
+            for i, distance in enumerate(nearest):
+                if distance != UNREACHABLE and distance > best_distance \
+                        and i not in landmarks:
+                    best, best_distance = i, distance
+            if best is None:
+                break
+            node = board.to_node((best % w, best // w))
+            table = distance_table(board, node)
+            landmarks.append(best)
+            tables.append(table)
+            if len(landmarks) == 1:
+                nearest = table
+            else:
+                nearest = array('I', map(min, nearest, table))
+        return cls(w, h, landmarks, tables, costs)
+
+    # Builds a heuristic function towards a goal node of the board
+    def estimator(self, board, goal):
+        if self.stale:
+            raise ValueError("the landmark index is out of date, its board "
+                             "has been edited")
+        w = self.width
+        gx, gy = board.coords(goal)
+        g = gy * w + gx
+        goal_cost = self.costs[g]
+        terms = []
+        for table in self.tables:
+            if table[g] != UNREACHABLE:
+                # d(L, goal), and d(goal, L) without the landmark's own cost
+                terms.append((table, table[g], table[g] - goal_cost))
+        costs = self.costs
+
+        def estimate(node):
+            x, y = board.coords(node)
+            n = y * w + x
+            best = abs(x - gx) + abs(y - gy)
+            for table, to_goal, from_goal in terms:
+                to_node = table[n]
+                if to_node == UNREACHABLE:
+                    continue
+                # d(L, goal) - d(L, n)
+                if to_goal - to_node > best:
+                    best = to_goal - to_node
+                # d(n, L) - d(goal, L), the landmark's cost cancels out
+                if to_node - costs[n] - from_goal > best:
+                    best = to_node - costs[n] - from_goal
+            return best
+        return estimate
+
+    # Writes the index as a header, the landmark cells, the terrain costs
+    # and one table per landmark, all as little endian uint32. The index
+    # is written to a temporary file first and then renamed, so processes
+    # reading it at the same time never see half of it.
+    def save(self, filename):
+        fd, temporary = tempfile.mkstemp(
+            prefix=os.path.basename(filename) + '.', suffix='.tmp',
+            dir=os.path.dirname(filename) or '.')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, self.width, self.height,
+                                    len(self.landmarks)))
+                for values in [array('I', self.landmarks), self.costs] + \
+                        self.tables:
+                    values = array('I', values)
+                    if sys.byteorder != 'little':
+                        values.byteswap()
+                    f.write(values.tobytes())
+            # mkstemp makes the file private, an index is not
+            os.chmod(temporary, 0o644)
+            os.replace(temporary, filename)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, 'rb') as f:
+            magic, width, height, count = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(filename + " is not a landmark index")
+
+            def read(n):
+                values = array('I')
+                values.frombytes(f.read(n * values.itemsize))
+                if sys.byteorder != 'little':
+                    values.byteswap()
+                return values
+            landmarks = list(read(count))
+            costs = read(width * height)
+            tables = [read(width * height) for _ in range(count)]
+        return cls(width, height, landmarks, tables, costs)
+
+
+# The index file of a board, next to the board file
+def index_name(board_name):
+    return board_name + '.alt'
+
+
+# Indexes already loaded by this process, by board file name, as
+# (modification time of the board, index) like in board.BoardCache
+_indexes = {}
+
+
+# Loads the index of a board, building and saving it first if it is
+# missing or older than the board file
+def index_for(board_name, count=8):
+    filename = index_name(board_name)
+    mtime = os.stat(board_name).st_mtime_ns
+    entry = _indexes.get(board_name)
+    if entry is not None and entry[0] == mtime:
+        return entry[1]
+    if os.path.exists(filename) and \
+            os.path.getmtime(filename) >= os.path.getmtime(board_name):
+        index = LandmarkIndex.load(filename)
+    else:
+        index = LandmarkIndex.build(load_board(board_name, compact=True),
+                                    count)
+        index.save(filename)
+    _indexes[board_name] = mtime, index
+    return index
+
+
+# Drops the loaded index of an edited board, and marks it stale for the
+# searches that still hold it
+def forget_index(board, positions):
+    entry = _indexes.pop(board.board, None)
+    if entry is not None:
+        entry[1].stale = True
+
+
+edit_hooks.append(forget_index)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Builds the landmark (ALT) index of every board.')
+    parser.add_argument('paths', nargs='+', help='board directories or files')
+    parser.add_argument('-k', '--landmarks', type=int, default=8,
+                        help='number of landmarks per board')
+    args = parser.parse_args(argv)
+    from batch import list_boards
+    for board_name in list_boards(args.paths):
+        index = LandmarkIndex.build(load_board(board_name, compact=True),
+                                    args.landmarks)
+        index.save(index_name(board_name))
+        print("Wrote " + index_name(board_name))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,112 +1,53 @@
-from queue import PriorityQueue, Queue
-from PIL import Image, ImageDraw
-from renderboard import BoardRender
+from collections import deque
+from functools import partial
+from heapq import heappop, heappush
+from bidirectional import bidirectional_a_star, bidirectional_dijkstra
+from board import BOARD_EXTENSIONS, Board, GridBoard, load_board, query_nodes
+from frontier import FRONTIERS
+from hpa import hierarchical_search
+from jps import jump_point_search, uniform_cost
+from result import make_result
+from stats import InstrumentedFrontier, finish, instrument
+import sys
 import time
 import os
 
 
-class Board:
-    def __init__(self, board_name):
-        self.start = None
-        self.goal = None  # me-irl
-        self.board = board_name
-        self.board_array = []
-        self.read_board()
-        self.board_w = len(self.board_array[0])
-        self.board_h = len(self.board_array)
-
-    # Returns if a given node is a wall (used by neighbour function)
-    def is_wall(self, node):
-        x, y = node
-        return self.board_array[y][x] == '#'
-
-    # Finds every valid neighbour of a node
-    def get_neighbors(self, node):
-        x, y = node
-        l, t, r, b = (x - 1, y), (x, y - 1), (x + 1, y), (x, y + 1)
-        valid_nodes = []
-        for node in [l, t, r, b]:
-            x, y = node
-            if 0 <= x < self.board_w and 0 <= y < self.board_h and not self.is_wall(node):
-                valid_nodes.append(node)
-        return valid_nodes
-
-    # Contains the costs of the different terrains
-    def cost_node(self, x):
-        return {
-            'w': 100,   # Water
-            'm': 50,    # Mountain
-            'f': 10,    # Forest
-            'g': 5,     # Grass
-            'r': 1,     # Road
-        }.get(x, 1)     # Default
-
-    # Finds the cost of a node
-    def cost(self, node):
-        x, y = node
-        return self.cost_node(self.board_array[y][x])
-
-    # Reads the board from the provided files, and makes them a 2d array
-    def read_board(self):
-        f = open(self.board)
-        board = []
-        for line in f:
-            board.append([c for c in line if c != '\n'])
-        # detect start and goal
-        for x in range(len(board[0])):
-            for y in range(len(board)):
-                c = board[y][x]
-                if not self.start and c == 'A':
-                    self.start = x, y
-                if not self.goal and c == 'B':
-                    self.goal = x, y
-
-        self.board_array = board
-        print("Read board of size " + str(len(self.board_array)) +
-              "," + str(len(self.board_array[0])))
-
-    # Saves the board as a image file
-    def save_image_board(self):
-        img = Image.new(
-            'RGB', (len(self.board_array[0]) * 20,
-                    len(self.board_array) * 20), "white")
-        idraw = ImageDraw.Draw(img)
-        for x in range(len(self.board_array[0])):
-            for y in range(len(self.board_array)):
-                color = self.colors[self.board_array[y][x]]
-                idraw.rectangle(
-                    [x * 20, y * 20, x * 20 + 20, y * 20 + 20], color)
-        img.show()
-
-
-# Heuristic used by astar algo
-def heuristic(goal, curr):
-    # Manhattan distance to goal
-    x_diff = abs(curr[0] - goal[0])
-    y_diff = abs(curr[1] - goal[1])
-    return x_diff + y_diff
-
-
 #  This astar algorithm is based on the algorithm found at redblobgames.com
-def shortest_path(board_name, prioritize=False):
-    board = Board(board_name)
-    start = board.start
-    goal = board.goal
-    frontier = PriorityQueue()
-    frontier.put((0, start))
+# The frontier is chosen by name from frontier.FRONTIERS. With a
+# landmarks.LandmarkIndex of the board, a_star uses the ALT heuristic
+# instead of the Manhattan distance. A stats.SearchStats given as stats
+# is filled in with the counters of the search.
+def shortest_path(board_name, prioritize=False, start=None, goal=None,
+                  frontier='heap', landmarks=None, stats=None):
+    board = instrument(load_board(board_name), stats)
+    start, goal = query_nodes(board, start, goal)
+    if landmarks is not None:
+        estimate = landmarks.estimator(board, goal)
+    else:
+        estimate = partial(board.heuristic, goal)
+    if frontier == 'heap' and isinstance(board, GridBoard):
+        return grid_search(board, prioritize, start, goal,
+                           None if landmarks is None else estimate)
+    frontier = FRONTIERS[frontier]()
+    if stats is not None:
+        frontier = InstrumentedFrontier(frontier, stats)
+    frontier.push(0, start)
     came_from = {}
     cost_so_far = {}
     came_from[start] = None
     cost_so_far[start] = 0
     considered = []
+    expanded = 0
 
     # While there are more nodes on the frontier
-    while not frontier.empty():
+    while frontier:
         # Gets the node with the highest priority
-        current = frontier.get()[1]
+        current = frontier.pop()
         # If it has found the goal, it's done!
         if current == goal:
             break
+        expanded += 1
 
         neighbors = board.get_neighbors(current)
         #  Neighbours named friend for friendliness
@@ -121,69 +62,175 @@ def shortest_path(board_name, prioritize=False):
                 # Calculates priority and adds it to queue
                 priority = new_cost  # dijkstra
                 if prioritize:  # a_star
-                    priority = new_cost + heuristic(goal, friend)
-                frontier.put((priority, friend))
+                    priority = new_cost + estimate(friend)
+                frontier.push(priority, friend)
                 # Sets predecessor
                 came_from[friend] = current
-    find_path(start, goal, came_from, considered, board)
+    algorithm = 'a_star' if prioritize else 'dijkstra'
+    return finish(make_result(board, algorithm, start, goal, came_from,
+                              considered, expanded), stats)
 
 
-def a_star(board_name):
-    shortest_path(board_name, prioritize=True)
+# shortest_path on a GridBoard with the heap frontier and no stats. The
+# node ids index flat lists of the costs so far and the predecessors
+# instead of dictionaries, the cost and neighbour tables of the board are
+# read directly and the heap is used inline. Entries are (priority, cost,
+# node), and an entry whose cost is above the node's cost so far is stale.
+# The Manhattan distance is worked out inline, unless an estimate (the ALT
+# heuristic) is given.
+def grid_search(board, prioritize, start, goal, estimate=None):
+    costs = board.costs
+    neighbors = board.neighbors
+    find_neighbors = board.get_neighbors
+    w = board.board_w
+    goal_x, goal_y = goal % w, goal // w
+    unseen = sys.maxsize
+    cost_so_far = [unseen] * len(costs)
+    came_from = [-1] * len(costs)
+    cost_so_far[start] = 0
+    frontier = [(0, 0, start)]
+    considered = []
+    consider = considered.append
+    expanded = 0
 
+    while frontier:
+        _, current_cost, current = heappop(frontier)
+        if current_cost > cost_so_far[current]:
+            continue
+        if current == goal:
+            break
+        expanded += 1
+        friends = neighbors[current]
+        if friends is None:
+            friends = find_neighbors(current)
+        for friend in friends:
+            new_cost = current_cost + costs[friend]
+            if new_cost < cost_so_far[friend]:
+                consider(friend)
+                cost_so_far[friend] = new_cost
+                came_from[friend] = current
+                if not prioritize:
+                    priority = new_cost
+                elif estimate is None:
+                    priority = new_cost + abs(friend % w - goal_x) + \
+                        abs(friend // w - goal_y)
+                else:
+                    priority = new_cost + estimate(friend)
+                heappush(frontier, (priority, new_cost, friend))
 
-# Same as the astar without the heuristic
-def dijkstra(board_name):
-    shortest_path(board_name)
+    # Only the predecessors along the path are handed to make_result
+    path_from = {start: None}
+    if cost_so_far[goal] != unseen:
+        node = goal
+        while node != start:
+            path_from[node] = came_from[node]
+            node = came_from[node]
+    algorithm = 'a_star' if prioritize else 'dijkstra'
+    return make_result(board, algorithm, start, goal, path_from, considered,
+                       expanded)
 
 
-def bfs(board_name):
-    board = Board(board_name)
-    start = board.start
-    goal = board.goal
-    frontier = Queue()
-    frontier.put(start)
+def breadth_first_search(board_name, start=None, goal=None, stats=None):
+    board = instrument(load_board(board_name), stats)
+    start, goal = query_nodes(board, start, goal)
+    frontier = deque([start])
+    if stats is not None:
+        stats.push(1)
     came_from = {}
     came_from[start] = None
     considered = []
+    expanded = 0
 
-    while not frontier.empty():
-        current = frontier.get()
+    while frontier:
+        current = frontier.popleft()
         if current == goal:
             break
+        expanded += 1
 
         neighbors = board.get_neighbors(current)
         for friend in neighbors:
             if friend not in came_from:
                 considered.append(friend)
-                frontier.put(friend)
+                frontier.append(friend)
                 came_from[friend] = current
-    find_path(start, goal, came_from, considered, board)
-
-
-# The function that finds the path by iterating through predecessors.
-def find_path(start, goal, came_from, considered, board):
-    current = goal
-    path = [current]
-    # Finds the path by iterating through predecessors to start
-    while current != start:
-        current = came_from[current]
-        path.append(current)
-    path.reverse()
-    print([p for p in path])
-    renderBoard = BoardRender(board.board_array)
+                if stats is not None:
+                    stats.push(len(frontier))
+    return finish(make_result(board, 'bfs', start, goal, came_from,
+                              considered, expanded), stats)
+
+
+# The headless searches, by name. None of these import tkinter or PIL.
+SEARCHES = {
+    'a_star': partial(shortest_path, prioritize=True),
+    'dijkstra': shortest_path,
+    'bfs': breadth_first_search,
+    'bidirectional_a_star': bidirectional_a_star,
+    'bidirectional_dijkstra': bidirectional_dijkstra,
+    'jps': jump_point_search,
+    'hpa_star': hierarchical_search,
+}
+
+# Searches that solve() replaces by Jump Point Search on boards where every
+# open cell has the same cost. The paths have the same cost.
+JPS_SEARCHES = ('a_star', 'bfs')
+
+
+# Solves a board without rendering anything and returns the SearchResult.
+# The board is taken from the board cache, so repeated queries on the same
+# map only parse it once. start and goal are (x, y) positions, and the
+# options (like frontier, or stats) are passed on to the search. a_star
+# and bfs run Jump Point Search instead on uniform cost boards, unless
+# auto_jps is False or a frontier or landmarks are asked for; the result
+# is then named 'jps'.
+def solve(board_name, algorithm='a_star', compact=False, start=None,
+          goal=None, auto_jps=True, **options):
+    board = load_board(board_name, compact, cached=True)
+    if auto_jps and algorithm in JPS_SEARCHES and \
+            options.get('frontier', 'heap') == 'heap' and \
+            options.get('landmarks') is None and uniform_cost(board):
+        return jump_point_search(board, start=start, goal=goal,
+                                 stats=options.get('stats'))
+    return SEARCHES[algorithm](board, start=start, goal=goal, **options)
+
+
+def a_star(board_name):
+    find_path(solve(board_name, 'a_star'))
+
+
+# Same as the astar without the heuristic
+def dijkstra(board_name):
+    find_path(solve(board_name, 'dijkstra'))
+
+
+def bfs(board_name):
+    find_path(solve(board_name, 'bfs'))
+
+
+# Renders a search result: first every considered node, then the path.
+# The board is read again from the file unless its rows are given. The
+# window is redrawn every stride nodes; renderimage writes the same
+# animation to a file without a window.
+def find_path(result, board_array=None, stride=1):
+    from renderboard import BoardRender
+
+    if board_array is None:
+        board_array = Board(result.board_name).board_array
+    print(result.path)
+    renderBoard = BoardRender(board_array)
     # Renders every considered node
-    for c in considered:
+    for i, c in enumerate(result.considered, 1):
         x, y = c
         renderBoard.considered(y, x)
-        renderBoard.redraw()
-        time.sleep(0.005)
+        if i % stride == 0:
+            renderBoard.redraw()
+            time.sleep(0.005)
     # Renders the path
-    for p in path:
+    for i, p in enumerate(result.path, 1):
         x, y = p
         renderBoard.visited(y, x)
-        renderBoard.redraw()
-        time.sleep(0.02)
+        if i % stride == 0 or i == len(result.path):
+            renderBoard.redraw()
+            time.sleep(0.02)
     time.sleep(1)
 
 
@@ -192,7 +239,9 @@ if __name__ == "__main__":
     def iterate_path(path, algorithm, board_name=None):
         for board in os.listdir(path):
             board_path = os.path.join(path, board)
-            if os.path.isfile(board_path):
+            # Skips the landmark indexes kept next to the boards
+            if os.path.isfile(board_path) and \
+                    board.endswith(BOARD_EXTENSIONS):
                 if board_name:
                     if board_name in board_path:
                         algorithm(board_path)
@@ -1,23 +1,13 @@
 import tkinter as tk
 
+from colors import COLORS
+
 
 def rgb(r, g, b):
     return '#%02x%02x%02x' % (r, g, b)
 
 
-colors = {
-    'w': rgb(73, 216, 245),  # Water
-    'm': rgb(99, 99, 99),  # Mountain
-    'f': rgb(3, 82, 0),  # Forest
-    'g': rgb(50, 200, 50),  # Grass
-    'r': rgb(114, 80, 41),  # Road
-    '.': rgb(255, 255, 255),  # Nothing
-    '#': rgb(114, 114, 114),  # Wall
-    'A': rgb(90, 180, 90),  # Start
-    'B': rgb(255, 90, 90),  # End
-    'v': rgb(255, 0, 0),
-    'c': rgb(150, 150, 150)
-}
+colors = {c: rgb(*color) for c, color in COLORS.items()}
 
 
 def get_color(c):
@@ -25,6 +15,11 @@ def get_color(c):
     return colors.get(c)
 
 
+# Draws a board in a window, with the nodes of a search on top. The
+# terrain is one image, drawn once at a pixel per cell and zoomed up to
+# cell_size, with a line between every row and column. Only the cells
+# that are considered or on the path get a canvas item, their dot, so
+# opening a window doesn't cost an item per cell of the board.
 class BoardRender(tk.Tk):
     def __init__(self, board_array):
         board_x = len(board_array[0])
@@ -40,39 +35,48 @@ class BoardRender(tk.Tk):
             relief='flat')
         self.canvas.pack(side="top", fill="both", expand="true")
 
-        self.rect = {}
+        # Unknown terrain is left white
+        cells = ' '.join('{' + ' '.join(get_color(c) or '#ffffff'
+                                        for c in row) + '}'
+                         for row in board_array)
+        terrain = tk.PhotoImage(master=self, width=board_x, height=board_y)
+        terrain.put(cells)
+        self.terrain = terrain.zoom(self.cell_size)
+        self.canvas.create_image(0, 0, image=self.terrain, anchor='nw')
+        for column in range(board_x + 1):
+            x = column * self.cell_size
+            self.canvas.create_line(x, 0, x, board_y * self.cell_size)
+        for row in range(board_y + 1):
+            y = row * self.cell_size
+            self.canvas.create_line(0, y, board_x * self.cell_size, y)
+
+        # The dots drawn so far, by (row, column)
         self.oval = {}
-        for column in range(board_x):
-            for row in range(board_y):
-                x1 = column * self.cell_size
-                y1 = row * self.cell_size
-                x2 = x1 + self.cell_size
-                y2 = y1 + self.cell_size
-                self.rect[row, column] = self.canvas.create_rectangle(
-                    x1, y1, x2, y2, tags="rect")
-                self.oval[row, column] = self.canvas.create_oval(
-                    x1 + 4, y1 + 4, x2 - 4, y2 - 4, tags="oval")
-
-        self.canvas.itemconfig("rect", fill="")
-        self.canvas.itemconfig("oval", fill="", outline="")
-
-        for i in range(board_y):
-            for j in range(board_x):
-                self.fill_square(j, i, color=board_array[i][j])
 
     def fill_square(self, x, y, color):
-        #  self.canvas.itemconfig("rect", fill=get_color(color))
-        pos = self.rect[y, x]
-        self.canvas.itemconfig(pos, fill=get_color(color))
+        k = self.cell_size
+        self.terrain.put(get_color(color) or '#ffffff',
+                         to=(x * k, y * k, (x + 1) * k, (y + 1) * k))
 
     def redraw(self):
         self.update_idletasks()
         self.update()
 
+    # Colours the dot of a cell, drawing it the first time
+    def dot(self, row, column, color):
+        pos = self.oval.get((row, column))
+        if pos is None:
+            x1 = column * self.cell_size
+            y1 = row * self.cell_size
+            x2 = x1 + self.cell_size
+            y2 = y1 + self.cell_size
+            self.oval[row, column] = self.canvas.create_oval(
+                x1 + 4, y1 + 4, x2 - 4, y2 - 4, fill=color, outline="")
+        else:
+            self.canvas.itemconfig(pos, fill=color)
+
     def visited(self, x, y):
-        pos = self.oval[x, y]
-        self.canvas.itemconfig(pos, fill=get_color('v'))
+        self.dot(x, y, get_color('v'))
 
     def considered(self, x, y):
-        pos = self.oval[x, y]
-        self.canvas.itemconfig(pos, fill=get_color('c'))
+        self.dot(x, y, get_color('c'))
@@ -0,0 +1,151 @@
+import argparse
+
+import numpy as np
+
+from board import load_board
+from colors import COLORS
+from distfield import board_arrays
+
+# Overlay states of a cell
+CONSIDERED = 1
+VISITED = 2
+
+# The colours in a fixed order, white (for unknown terrain) first, so
+# images can be kept as indices into it
+PALETTE = [(255, 255, 255)] + list(COLORS.values())
+_SLOTS = {c: i for i, c in enumerate(COLORS, 1)}
+
+
+# Lookup table from terrain bytes to indices into PALETTE
+def terrain_slots():
+    table = np.zeros(256, dtype=np.uint8)
+    for c, slot in _SLOTS.items():
+        table[ord(c)] = slot
+    return table
+
+
+# Draws boards and search overlays into images. The colour of every cell
+# is looked up at once and scaled up to cell_size pixels per cell; the
+# overlay puts a dot in the middle of the cells that were considered or
+# are on the path, like BoardRender does. The images are kept as palette
+# indices, which PIL writes to PNG and GIF without converting them.
+class ImageRender:
+    def __init__(self, board, cell_size=8):
+        terrain = board_arrays(board)[0]
+        self.h, self.w = terrain.shape
+        self.cell_size = cell_size
+        self.background = self.scale(terrain_slots()[terrain])
+        self.overlay_slots = np.array([0, _SLOTS['c'], _SLOTS['v']],
+                                      dtype=np.uint8)
+        # The dot inside one cell, a quarter of the cell in from each side
+        inset = cell_size // 4
+        dot = np.zeros((cell_size, cell_size), dtype=bool)
+        dot[inset:cell_size - inset, inset:cell_size - inset] = True
+        self.dots = np.tile(dot, (self.h, self.w))
+        self.state = np.zeros((self.h, self.w), dtype=np.uint8)
+
+    def scale(self, cells):
+        k = self.cell_size
+        return np.repeat(np.repeat(cells, k, axis=0), k, axis=1)
+
+    def considered(self, positions):
+        self.mark(positions, CONSIDERED)
+
+    def visited(self, positions):
+        self.mark(positions, VISITED)
+
+    # Sets the overlay state of (x, y) positions
+    def mark(self, positions, state):
+        if len(positions):
+            xs, ys = np.asarray(positions, dtype=np.intp).T
+            self.state[ys, xs] = state
+
+    def clear(self):
+        self.state[:] = 0
+
+    # The board with the overlay as palette indices, (height, width)
+    def indices(self):
+        state = self.scale(self.state)
+        dots = self.dots & (state > 0)
+        image = self.background.copy()
+        image[dots] = self.overlay_slots[state[dots]]
+        return image
+
+    # The board with the overlay as an RGB (height, width, 3) array
+    def image(self):
+        return np.array(PALETTE, dtype=np.uint8)[self.indices()]
+
+    def to_pil(self):
+        from PIL import Image
+
+        img = Image.fromarray(self.indices(), 'P')
+        img.putpalette([value for color in PALETTE for value in color])
+        return img
+
+
+# Frames of a search result as PIL images: one every stride considered
+# nodes, then one every stride path nodes, ending with the whole path
+def result_frames(result, board=None, cell_size=8, stride=50):
+    if board is None:
+        board = load_board(result.board_name, compact=True)
+    render = ImageRender(board, cell_size)
+    for nodes, mark in ((result.considered, render.considered),
+                        (result.path, render.visited)):
+        for i in range(0, len(nodes), stride):
+            mark(nodes[i:i + stride])
+            yield render.to_pil()
+    if not result.considered and not result.path:
+        yield render.to_pil()
+
+
+# Writes the finished search (every considered node and the path) as one
+# image, in any format PIL knows from the file name, like PNG
+def save_image(result, filename, board=None, cell_size=8):
+    if board is None:
+        board = load_board(result.board_name, compact=True)
+    render = ImageRender(board, cell_size)
+    render.considered(result.considered)
+    render.visited(result.path)
+    render.to_pil().save(filename)
+
+
+# Writes the search as an animated GIF, frame_time milliseconds a frame.
+# The last frame is held for a second. The frames share one palette, so
+# PIL's palette optimisation (most of the time spent saving) is skipped.
+def save_animation(result, filename, board=None, cell_size=8, stride=50,
+                   frame_time=40):
+    frames = list(result_frames(result, board, cell_size, stride))
+    durations = [frame_time] * (len(frames) - 1) + [1000]
+    frames[0].save(filename, save_all=True, append_images=frames[1:],
+                   duration=durations, loop=0, optimize=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Solves a board and writes the search as an image, or '
+                    'as an animated GIF.')
+    parser.add_argument('board', help='board file')
+    parser.add_argument('output', help='image file, a .gif is animated')
+    parser.add_argument('-a', '--algorithm', default='a_star',
+                        help='search to draw (default a_star)')
+    parser.add_argument('--cell-size', type=int, default=8,
+                        help='pixels per cell')
+    parser.add_argument('--stride', type=int, default=50,
+                        help='nodes drawn per animation frame')
+    parser.add_argument('--frame-time', type=int, default=40,
+                        help='milliseconds per animation frame')
+    args = parser.parse_args(argv)
+    from main import solve
+
+    board = load_board(args.board, compact=True)
+    result = solve(board, args.algorithm)
+    if args.output.lower().endswith('.gif'):
+        save_animation(result, args.output, board, args.cell_size,
+                       args.stride, args.frame_time)
+    else:
+        save_image(result, args.output, board, args.cell_size)
+    print("Wrote " + args.output)
+
+
+if __name__ == "__main__":
+    main()
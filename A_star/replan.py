@@ -0,0 +1,133 @@
+from heapq import heappop, heappush
+
+from board import load_board, query_nodes
+from result import make_result
+from stats import finish, instrument
+
+INFINITY = float('inf')
+
+
+# Incremental replanning with Lifelong Planning A* (LPA*). The planner
+# keeps its search state between plans: g is the cost of a node as of the
+# last expansion, and rhs the best cost through its predecessors now.
+# After cells of the board change, only the nodes next to them are
+# updated, and the next plan only expands the nodes whose cost actually
+# changes, instead of searching from scratch.
+#
+# Entering a cell costs board.cost(cell), like in shortest_path. With a
+# stats.SearchStats, every plan() starts it over and fills it in.
+class IncrementalPlanner:
+    def __init__(self, board_name, start=None, goal=None, stats=None):
+        self.stats = stats
+        self.board = instrument(load_board(board_name), stats)
+        self.start, self.goal = query_nodes(self.board, start, goal)
+        self.g = {}
+        self.rhs = {self.start: 0}
+        self.frontier = []
+        self.considered = []
+        self.expanded = 0
+        self.push(self.start)
+
+    def key(self, node):
+        best = min(self.g.get(node, INFINITY), self.rhs.get(node, INFINITY))
+        return best + self.board.heuristic(self.goal, node), best
+
+    def push(self, node):
+        heappush(self.frontier, (self.key(node), node))
+        if self.stats is not None:
+            self.stats.push(len(self.frontier))
+
+    def is_consistent(self, node):
+        return self.g.get(node, INFINITY) == self.rhs.get(node, INFINITY)
+
+    # The cells next to a node, walls included, since a cell that became a
+    # wall still has to tell its neighbours
+    def cells_around(self, node):
+        board = self.board
+        x, y = board.coords(node)
+        for nx, ny in ((x - 1, y), (x, y - 1), (x + 1, y), (x, y + 1)):
+            if 0 <= nx < board.board_w and 0 <= ny < board.board_h:
+                yield board.to_node((nx, ny))
+
+    # Finds the best cost of a node through its predecessors
+    def update_node(self, node):
+        board = self.board
+        if node != self.start:
+            best = INFINITY
+            if not board.is_wall(node):
+                cost = board.cost(node)
+                for friend in board.get_neighbors(node):
+                    g = self.g.get(friend, INFINITY) + cost
+                    if g < best:
+                        best = g
+            self.rhs[node] = best
+        if not self.is_consistent(node):
+            self.push(node)
+
+    # Expands inconsistent nodes until the goal's cost is settled. Entries
+    # whose node became consistent, or whose key is out of date, are
+    # skipped or pushed again.
+    def compute(self):
+        board = self.board
+        goal = self.goal
+        while self.frontier:
+            key, current = self.frontier[0]
+            if key >= self.key(goal) and self.is_consistent(goal):
+                break
+            heappop(self.frontier)
+            stale = self.is_consistent(current)
+            new_key = self.key(current)
+            if not stale and key != new_key:
+                # An entry with the current key is in the queue already,
+                # unless the key went up
+                if key < new_key:
+                    heappush(self.frontier, (new_key, current))
+                stale = True
+            if stale:
+                if self.stats is not None:
+                    self.stats.stale += 1
+                continue
+            self.expanded += 1
+            if self.g.get(current, INFINITY) > self.rhs[current]:
+                self.g[current] = self.rhs[current]
+            else:
+                self.g[current] = INFINITY
+                self.update_node(current)
+            for friend in board.get_neighbors(current):
+                self.considered.append(friend)
+                self.update_node(friend)
+
+    # Plans (or replans) the path, and returns it as a SearchResult. The
+    # expanded count and considered nodes are those of this plan only.
+    def plan(self):
+        self.expanded = 0
+        self.considered = []
+        if self.stats is not None:
+            self.stats.reset()
+            self.stats.start()
+        self.compute()
+        board = self.board
+        came_from = {self.start: None}
+        current = self.goal
+        if self.g.get(current, INFINITY) < INFINITY:
+            # Walks back along the predecessors that give the cost
+            while current != self.start:
+                best = min(board.get_neighbors(current),
+                           key=lambda friend: self.g.get(friend, INFINITY))
+                came_from[current] = best
+                current = best
+        return finish(make_result(board, 'lpa_star', self.start, self.goal,
+                                  came_from, self.considered, self.expanded),
+                      self.stats)
+
+    # Changes cells of the board, given as {(x, y): terrain}, and updates
+    # the nodes whose cost may change because of it
+    def update_cells(self, changes):
+        nodes = set()
+        for position, terrain in changes.items():
+            self.board.set_cell(position, terrain)
+            node = self.board.to_node(position)
+            nodes.add(node)
+            nodes.update(self.cells_around(node))
+        for node in nodes:
+            self.update_node(node)
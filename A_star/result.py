@@ -0,0 +1,56 @@
+# Result of a search. The nodes are stored as (x, y) positions, so a
+# result can be written out as JSON and rendered later without the board.
+class SearchResult:
+    def __init__(self, board_name, algorithm, start, goal, path, cost,
+                 expanded, considered):
+        self.board_name = board_name
+        self.algorithm = algorithm
+        self.start = start
+        self.goal = goal
+        self.path = path
+        self.cost = cost
+        self.expanded = expanded
+        self.considered = considered
+
+    def to_dict(self):
+        return {
+            'board': self.board_name,
+            'algorithm': self.algorithm,
+            'start': list(self.start),
+            'goal': list(self.goal),
+            'path': [list(p) for p in self.path],
+            'cost': self.cost,
+            'expanded': self.expanded,
+            'considered': [list(c) for c in self.considered],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['board'], data['algorithm'], tuple(data['start']),
+                   tuple(data['goal']), [tuple(p) for p in data['path']],
+                   data['cost'], data['expanded'],
+                   [tuple(c) for c in data['considered']])
+
+
+# Finds the path by iterating through predecessors from the goal to start
+def reconstruct_path(start, goal, came_from):
+    if goal not in came_from:
+        return []
+    current = goal
+    path = [current]
+    while current != start:
+        current = came_from[current]
+        path.append(current)
+    path.reverse()
+    return path
+
+
+# Builds the result of a finished search
+def make_result(board, algorithm, start, goal, came_from, considered,
+                expanded):
+    path = reconstruct_path(start, goal, came_from)
+    # The start node is not paid for, same as in cost_so_far
+    cost = sum(board.cost(p) for p in path[1:]) if path else None
+    return SearchResult(board.board, algorithm, board.coords(start),
+                        board.coords(goal), [board.coords(p) for p in path],
+                        cost, expanded, [board.coords(c) for c in considered])
@@ -0,0 +1,127 @@
+import json
+from time import perf_counter
+
+
+# Counters of one search. Pass one as stats= to a search to fill it in;
+# without it the searches only pay for a few "stats is not None" checks.
+#
+# expanded: nodes taken off the frontier and expanded
+# pushed: entries put on the frontier
+# stale: popped entries that were out of date (already expanded, or
+#   with a priority that was improved since) and skipped
+# peak_frontier: the most entries on the frontier at once
+# neighbor_time, cost_time: seconds spent in board.get_neighbors and
+#   board.cost, over neighbor_calls and cost_calls calls
+class SearchStats:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.board_name = None
+        self.algorithm = None
+        self.expanded = 0
+        self.pushed = 0
+        self.stale = 0
+        self.peak_frontier = 0
+        self.neighbor_calls = 0
+        self.neighbor_time = 0.0
+        self.cost_calls = 0
+        self.cost_time = 0.0
+        self.elapsed = 0.0
+        self.started = None
+
+    def start(self):
+        self.started = perf_counter()
+
+    # Counts a push onto a frontier that now holds size entries
+    def push(self, size):
+        self.pushed += 1
+        if size > self.peak_frontier:
+            self.peak_frontier = size
+
+    # Takes what the result knows, and stops the clock
+    def record(self, result):
+        self.board_name = result.board_name
+        self.algorithm = result.algorithm
+        self.expanded = result.expanded
+        if self.started is not None:
+            self.elapsed = perf_counter() - self.started
+
+    def to_dict(self):
+        return {
+            'board': self.board_name,
+            'algorithm': self.algorithm,
+            'expanded': self.expanded,
+            'pushed': self.pushed,
+            'stale': self.stale,
+            'peak_frontier': self.peak_frontier,
+            'neighbor_calls': self.neighbor_calls,
+            'neighbor_time': self.neighbor_time,
+            'cost_calls': self.cost_calls,
+            'cost_time': self.cost_time,
+            'elapsed': self.elapsed,
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+
+# A board that times its get_neighbors and cost calls into a SearchStats.
+# Everything else is passed on to the board.
+class InstrumentedBoard:
+    def __init__(self, board, stats):
+        self.board_object = board
+        self.stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self.board_object, name)
+
+    def get_neighbors(self, node):
+        started = perf_counter()
+        neighbors = self.board_object.get_neighbors(node)
+        self.stats.neighbor_time += perf_counter() - started
+        self.stats.neighbor_calls += 1
+        return neighbors
+
+    def cost(self, node):
+        started = perf_counter()
+        cost = self.board_object.cost(node)
+        self.stats.cost_time += perf_counter() - started
+        self.stats.cost_calls += 1
+        return cost
+
+
+# A frontier (see frontier.FRONTIERS) that counts its pushes and size
+class InstrumentedFrontier:
+    def __init__(self, frontier, stats):
+        self.frontier = frontier
+        self.stats = stats
+
+    def __len__(self):
+        return len(self.frontier)
+
+    def push(self, priority, node):
+        self.frontier.push(priority, node)
+        self.stats.push(len(self.frontier))
+
+    def pop(self):
+        stale = self.frontier.stale
+        node = self.frontier.pop()
+        self.stats.stale += self.frontier.stale - stale
+        return node
+
+
+# Starts the stats of a search on a board, and returns the board to search
+# on: the board itself without stats, else an InstrumentedBoard
+def instrument(board, stats):
+    if stats is None:
+        return board
+    stats.start()
+    return InstrumentedBoard(board, stats)
+
+
+# Records the result into the stats, if any, and returns it
+def finish(result, stats):
+    if stats is not None:
+        stats.record(result)
+    return result
@@ -0,0 +1,255 @@
+import glob
+import os
+import random
+import shutil
+
+import pytest
+
+from batch import solve_job
+from binboard import convert
+from board import Board, GridBoard, load_board
+from hpa import hierarchical_search
+from jps import jump_point_search, uniform_cost
+from landmarks import UNREACHABLE, LandmarkIndex, distance_table, \
+    index_for
+from main import SEARCHES, shortest_path, solve
+from replan import IncrementalPlanner
+from stats import SearchStats
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BOARDS = sorted(glob.glob(os.path.join(HERE, 'boards', '*.txt')) +
+                glob.glob(os.path.join(HERE, 'trondheim', '*.txt')) +
+                glob.glob(os.path.join(HERE, 'harstad', '*.txt')) +
+                glob.glob(os.path.join(HERE, 'sverige', '*.txt')))
+CITY_BOARD = os.path.join(HERE, 'trondheim',
+                          'board-trondheim+_to_kirkegata+97139.txt')
+
+
+def board_id(path):
+    return os.path.basename(path)[:24]
+
+
+def write_board(directory, rows, name='board.txt'):
+    filename = os.path.join(str(directory), name)
+    with open(filename, 'w') as f:
+        f.write('\n'.join(rows) + '\n')
+    return filename
+
+
+def check_path(board_name, result):
+    """Check that the path of a result is a walk of open neighbouring
+    cells from its start to its goal that costs result.cost.
+    """
+    board = load_board(board_name)
+    path = result.path
+    assert path[0] == result.start
+    assert path[-1] == result.goal
+    for (x0, y0), (x1, y1) in zip(path, path[1:]):
+        assert abs(x1 - x0) + abs(y1 - y0) == 1
+    assert not any(board.is_wall(p) for p in path)
+    assert sum(board.cost(p) for p in path[1:]) == result.cost
+
+
+def random_queries(board, count, seed=0):
+    rng = random.Random(seed)
+    cells = [(x, y) for y in range(board.board_h) for x in range(board.board_w)
+             if not board.is_wall(board.to_node((x, y)))]
+    return [(rng.choice(cells), rng.choice(cells)) for _ in range(count)]
+
+
+@pytest.mark.parametrize('board_name', BOARDS, ids=board_id)
+@pytest.mark.parametrize('compact', [False, True])
+def test_searches_match_dijkstra(board_name, compact):
+    board = load_board(board_name, compact)
+    expected = shortest_path(board).cost
+    uniform = uniform_cost(board)
+    for algorithm, search in SEARCHES.items():
+        if algorithm in ('bfs', 'jps') and not uniform:
+            continue
+        result = search(board)
+        if algorithm == 'hpa_star':
+            assert result.cost >= expected
+        else:
+            assert result.cost == expected, algorithm
+        check_path(board_name, result)
+    # With a transition on every border cell, HPA* paths are optimal
+    assert hierarchical_search(board, entrance_step=1).cost == expected
+    index = LandmarkIndex.build(board)
+    assert shortest_path(board, True, landmarks=index).cost == expected
+    for frontier in ('queue', 'bucket'):
+        assert shortest_path(board, True, frontier=frontier).cost == expected
+
+
+def test_random_queries_match_dijkstra():
+    plain = load_board(CITY_BOARD)
+    compact = load_board(CITY_BOARD, compact=True)
+    index = LandmarkIndex.build(compact)
+    for start, goal in random_queries(plain, 30):
+        expected = shortest_path(plain, False, start, goal).cost
+        assert shortest_path(compact, False, start, goal).cost == expected
+        assert shortest_path(compact, True, start, goal,
+                             landmarks=index).cost == expected
+        for algorithm in ('bidirectional_a_star', 'bidirectional_dijkstra'):
+            result = SEARCHES[algorithm](compact, start, goal)
+            assert result.cost == expected
+
+
+def test_jump_point_search_on_walled_grids(tmp_path):
+    rng = random.Random(3)
+    for i in range(30):
+        w, h = rng.randint(1, 20), rng.randint(1, 20)
+        rows = [''.join('#' if rng.random() < 0.3 else '.' for _ in range(w))
+                for _ in range(h)]
+        filename = write_board(tmp_path, rows, 'grid-%d.txt' % i)
+        for compact in (False, True):
+            board = load_board(filename, compact)
+            for start, goal in random_queries(board, 5, i):
+                expected = shortest_path(board, False, start, goal).cost
+                result = jump_point_search(board, start, goal)
+                assert result.cost == expected
+                if result.path:
+                    check_path(filename, result)
+
+
+def test_solve_runs_jps_on_uniform_boards():
+    board_name = os.path.join(HERE, 'boards', 'board-1-1.txt')
+    expected = shortest_path(board_name, True).cost
+    for compact in (False, True):
+        result = solve(board_name, 'a_star', compact)
+        assert result.algorithm == 'jps'
+        assert result.cost == expected
+        for options in ({'auto_jps': False}, {'frontier': 'bucket'}):
+            result = solve(board_name, 'a_star', compact, **options)
+            assert result.algorithm == 'a_star'
+            assert result.cost == expected
+    assert solve(CITY_BOARD, 'a_star').algorithm == 'a_star'
+
+
+def test_lpa_star_matches_a_fresh_search_after_set_cell(tmp_path):
+    rng = random.Random(5)
+    for compact in (False, True):
+        planner = IncrementalPlanner(load_board(CITY_BOARD, compact))
+        fresh = load_board(CITY_BOARD, compact)
+        assert planner.plan().cost == shortest_path(fresh).cost
+        for _ in range(10):
+            # Walls on the current path, and some other terrain
+            path = planner.plan().path
+            changes = {}
+            if len(path) > 2:
+                changes[rng.choice(path[1:-1])] = '#'
+            x, y = rng.randrange(fresh.board_w), rng.randrange(fresh.board_h)
+            changes[x, y] = rng.choice('rgfmw.')
+            changes.pop(fresh.coords(fresh.start), None)
+            changes.pop(fresh.coords(fresh.goal), None)
+            planner.update_cells(changes)
+            for position, terrain in changes.items():
+                fresh.set_cell(position, terrain)
+            result = planner.plan()
+            assert result.cost == shortest_path(fresh).cost
+            if result.path:
+                check_path_on(fresh, result)
+
+
+def check_path_on(board, result):
+    path = result.path
+    assert path[0] == result.start and path[-1] == result.goal
+    for (x0, y0), (x1, y1) in zip(path, path[1:]):
+        assert abs(x1 - x0) + abs(y1 - y0) == 1
+    assert sum(board.cost(board.to_node(p)) for p in path[1:]) == result.cost
+
+
+def test_hpa_star_and_landmarks_follow_set_cell(tmp_path):
+    rng = random.Random(8)
+    board_name = str(tmp_path / 'board.txt')
+    shutil.copy(CITY_BOARD, board_name)
+    for compact in (False, True):
+        board = GridBoard(board_name) if compact else Board(board_name)
+        hierarchical_search(board, entrance_step=1)
+        index = index_for(board_name)
+        for _ in range(5):
+            x, y = rng.randrange(board.board_w), rng.randrange(board.board_h)
+            board.set_cell((x, y), rng.choice('#rw'))
+            start, goal = random_queries(board, 1, rng.random())[0]
+            expected = shortest_path(board, False, start, goal).cost
+            result = hierarchical_search(board, start, goal, entrance_step=1)
+            assert result.cost == expected
+        # The landmark distances may no longer be lower bounds
+        assert index.stale
+        with pytest.raises(ValueError):
+            shortest_path(board, True, landmarks=index)
+
+
+@pytest.mark.parametrize('board_name', BOARDS, ids=board_id)
+def test_distance_field_matches_dijkstra(board_name):
+    np = pytest.importorskip('numpy')
+    import distfield
+    from distfield import SWEEP_BUDGET, distance_field
+
+    board = load_board(board_name, compact=True)
+    expected = np.array(distance_table(board, board.start), dtype=np.int64)
+    expected[expected == UNREACHABLE] = -1
+    expected = expected.reshape(board.board_h, board.board_w)
+    try:
+        # The sweeps, and the search they give up for
+        for budget in (SWEEP_BUDGET, 0):
+            distfield.SWEEP_BUDGET = budget
+            distances, predecessors = distance_field(board)
+            assert (distances == expected).all()
+            w = board.board_w
+            for y, x in zip(*np.nonzero(predecessors >= 0)):
+                before = predecessors[y, x]
+                assert distances[before // w, before % w] + \
+                    board.cost(board.to_node((x, y))) == distances[y, x]
+    finally:
+        distfield.SWEEP_BUDGET = SWEEP_BUDGET
+
+
+def test_binary_boards_match_text_boards(tmp_path):
+    for board_name in BOARDS[:2] + [CITY_BOARD]:
+        binary = convert(board_name, str(tmp_path / 'board.bin'))
+        for compact in (False, True):
+            text, mapped = load_board(board_name, compact), \
+                load_board(binary, compact)
+            assert mapped.board_array == text.board_array
+            assert mapped.coords(mapped.start) == text.coords(text.start)
+            assert shortest_path(mapped).cost == shortest_path(text).cost
+
+
+def test_landmark_index_round_trip(tmp_path):
+    board = load_board(CITY_BOARD, compact=True)
+    index = LandmarkIndex.build(board, count=4)
+    filename = str(tmp_path / 'board.alt')
+    index.save(filename)
+    loaded = LandmarkIndex.load(filename)
+    assert loaded.landmarks == index.landmarks
+    assert [list(t) for t in loaded.tables] == [list(t) for t in index.tables]
+
+
+def test_landmarks_without_a_start(tmp_path):
+    filename = write_board(tmp_path, ['..#r', 'ww.m'])
+    board = load_board(filename)
+    index = LandmarkIndex.build(board)
+    assert index.landmarks
+    expected = shortest_path(board, False, (0, 0), (3, 0)).cost
+    assert shortest_path(board, True, (0, 0), (3, 0),
+                         landmarks=index).cost == expected
+    walls = load_board(write_board(tmp_path, ['##', '##'], 'walls.txt'))
+    assert LandmarkIndex.build(walls).landmarks == []
+
+
+def test_stats_count_the_search():
+    for algorithm in sorted(SEARCHES):
+        if algorithm in ('bfs', 'jps'):
+            continue
+        stats = SearchStats()
+        result = solve(CITY_BOARD, algorithm, stats=stats)
+        assert stats.expanded == result.expanded
+        assert stats.pushed > 0
+        assert stats.algorithm == result.algorithm
+
+
+def test_batch_job_keeps_the_search_result():
+    data = solve_job((CITY_BOARD, 'dijkstra', True, None, None,
+                      {'stats': True}))
+    assert data['cost'] == shortest_path(CITY_BOARD).cost
+    assert data['stats']['expanded'] == data['expanded']
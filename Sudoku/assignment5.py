@@ -2,14 +2,94 @@
 
 import copy
 import itertools
-from random import choice
+from collections import deque
+from random import Random
+
+# The propagation algorithms of CSP.inference. 'full' is the original
+# AC-3 that re-queues every arc after each assignment, 'ac3' only queues
+# the arcs into the assigned variable, and 'ac2001' does the same while
+# remembering the last support found for every value.
+PROPAGATIONS = ('full', 'ac3', 'ac2001')
+# The variable orderings of CSP.select_unassigned_variable. 'first' is the
+# original choice of the first variable with two values left, 'mrv' picks
+# one with the fewest values left and the most undecided neighbours, and
+# 'domwdeg' the one with the lowest domain size to weighted degree ratio.
+VARIABLE_ORDERINGS = ('first', 'mrv', 'domwdeg')
+# The value orderings of CSP.order_domain_values. 'domain' tries the
+# values in domain order, 'lcv' the least constraining values first.
+VALUE_ORDERINGS = ('domain', 'lcv')
+# The reasoning of an Alldiff constraint. 'pairwise' is only the "not
+# equal" arcs between its variables, 'singles' also finds the values that
+# fit a single variable (hidden singles), and 'subsets' also finds k
+# variables with only k values between them (naked subsets) and k values
+# that fit only k variables (hidden subsets).
+ALL_DIFFERENT_REASONINGS = ('pairwise', 'singles', 'subsets')
+
+
+def luby(i):
+    """Get the i-th term of the Luby sequence 1, 1, 2, 1, 1, 2, 4, 1, ...,
+    from 1, which scales the failure limits of CSP.restarting_search.
+    """
+    k = i.bit_length()
+    if i == (1 << k) - 1:
+        return 1 << (k - 1)
+    return luby(i - (1 << (k - 1)) + 1)
+
+
+class RestartSearch(Exception):
+    """Raised by CSP.backtrack when a run of restarting_search reaches
+    its failure limit.
+    """
 
 
 class CSP:
-    def __init__(self, select_randomly=True):
+    def __init__(self, select_randomly=True, use_trail=False,
+                 propagation='full', variable_ordering='first',
+                 value_ordering='domain', seed=None):
         # used to determine whether to select randomly in
         # select-random-variable and order-domain-values
         self.select_randomly = select_randomly
+        # the random choices of this CSP, repeatable with a 'seed'
+        self.random = Random(seed)
+        # used to determine whether backtrack undoes its changes from a
+        # trail instead of working on copies of the assignment
+        self.use_trail = use_trail
+        # the changes made to the assignment, while searching with a trail
+        self.trail = None
+        # one of PROPAGATIONS, used to determine how inference runs AC-3
+        if propagation not in PROPAGATIONS:
+            raise ValueError('unknown propagation: ' + str(propagation))
+        self.propagation = propagation
+        # the values of j that support value x of i, in the order of the
+        # domain of j, by (i, j) and then x; and the index in that list of
+        # the last support found, by (i, j, x). Used by 'ac2001'.
+        self.support_lists = {}
+        self.last_support = {}
+        # one of VARIABLE_ORDERINGS and one of VALUE_ORDERINGS
+        if variable_ordering not in VARIABLE_ORDERINGS:
+            raise ValueError('unknown variable ordering: ' +
+                             str(variable_ordering))
+        if value_ordering not in VALUE_ORDERINGS:
+            raise ValueError('unknown value ordering: ' +
+                             str(value_ordering))
+        self.variable_ordering = variable_ordering
+        self.value_ordering = value_ordering
+        # self.buckets[n] is the set of variables with n legal values,
+        # kept up to date while searching with the 'mrv' ordering
+        self.buckets = None
+        # the position of every variable in self.variables, for ties
+        self.order = {}
+        # the weight of every constraint (i, j), raised each time it
+        # empties a domain, for 'domwdeg'. Missing weights are 1.
+        self.weights = {}
+        # the legal value pairs of constraint (i, j) as a set, for 'lcv'
+        self.pair_sets = {}
+        # whether the variables and constraints are shared with the
+        # template this CSP was instantiated from, see unshare
+        self.shared = False
+        # the Alldiff constraints with more than pairwise reasoning, as
+        # (variables, reasoning), checked by inference after AC-3
+        self.all_different = []
         # self.variables is a list of the variable names in the CSP
         self.variables = []
 
@@ -19,17 +99,27 @@ class CSP:
         # self.constraints[i][j] is a list of legal value pairs for
         # the variable pair (i, j)
         self.constraints = {}
+        # the lists of get_all_arcs and get_all_neighboring_arcs, built on
+        # first use and dropped when a constraint is added
+        self.arcs = None
+        self.neighboring_arcs = {}
 
         self.calls = 0
         self.failure = 0
+        # the failure count at which backtrack gives up on the current
+        # run of restarting_search, and the number of restarts so far
+        self.failure_limit = None
+        self.restarts = 0
 
     def add_variable(self, name, domain):
         """Add a new variable to the CSP. 'name' is the variable name
         and 'domain' is a list of the legal values for the variable.
         """
+        self.unshare()
         self.variables.append(name)
         self.domains[name] = list(domain)
         self.constraints[name] = {}
+        self.arcs = None
 
     def get_all_possible_pairs(self, a, b):
         """Get a list of all possible pairs (as tuples) of the values in
@@ -43,13 +133,21 @@ class CSP:
         the CSP. The arcs/constraints are represented as tuples (i, j),
         indicating a constraint between variable 'i' and 'j'.
         """
-        return [(i, j) for i in self.constraints for j in self.constraints[i]]
+        if self.arcs is None:
+            self.arcs = [(i, j) for i in self.constraints
+                         for j in self.constraints[i]]
+        return list(self.arcs)
 
     def get_all_neighboring_arcs(self, var):
         """Get a list of all arcs/constraints going to/from variable
         'var'. The arcs/constraints are represented as in get_all_arcs().
+        The list is shared between calls, so it must not be changed.
         """
-        return [(i, var) for i in self.constraints[var]]
+        arcs = self.neighboring_arcs.get(var)
+        if arcs is None:
+            arcs = [(i, var) for i in self.constraints[var]]
+            self.neighboring_arcs[var] = arcs
+        return arcs
 
     def add_constraint_one_way(self, i, j, filter_function):
         """Add a new constraint between variables 'i' and 'j'. The legal
@@ -60,6 +158,9 @@ class CSP:
         to add the constraint the other way, j -> i, as all constraints
         are supposed to be two-way connections!
         """
+        self.unshare()
+        self.arcs = None
+        self.neighboring_arcs = {}
         if j not in self.constraints[i]:
             # First, get a list of all possible pairs
             # of values between variables i and j
@@ -68,35 +169,138 @@ class CSP:
 
         # Next, filter this list of value pairs through the function
         # 'filter_function', so that only the legal value pairs remain
-        self.constraints[i][j] = filter(
+        self.constraints[i][j] = list(filter(
             lambda value_pair: filter_function(*value_pair),
-            self.constraints[i][j])
+            self.constraints[i][j]))
 
-    def add_all_different_constraint(self, variables):
+    def add_all_different_constraint(self, variables, reasoning='pairwise'):
         """Add an Alldiff constraint between all of the variables in the
-        list 'variables'.
+        list 'variables'. 'reasoning', one of ALL_DIFFERENT_REASONINGS,
+        is how much inference does with it on top of the pairwise arcs.
         """
         for (i, j) in self.get_all_possible_pairs(variables, variables):
             if i != j:
                 self.add_constraint_one_way(i, j, lambda x, y: x != y)
+        self.add_all_different_reasoning(variables, reasoning)
+
+    def add_all_different_reasoning(self, variables, reasoning):
+        """Have inference check the Alldiff constraint between
+        'variables' as a whole, with 'reasoning'.
+        """
+        if reasoning not in ALL_DIFFERENT_REASONINGS:
+            raise ValueError('unknown Alldiff reasoning: ' + str(reasoning))
+        if reasoning != 'pairwise':
+            self.unshare()
+            self.all_different.append((list(variables), reasoning))
+
+    def instantiate(self, givens, select_randomly=True, **options):
+        """Get a new CSP of the same class, with the variables and
+        constraints of this one, and the domains of the variables in
+        'givens', a dictionary from variable name to value, reduced to
+        that value. The constraints, arc lists and supports are shared,
+        not copied, so this one works as a template that is compiled
+        once; adding variables or constraints to the new CSP copies them
+        first, see unshare. The options are those of the constructor.
+        """
+        csp = type(self)(select_randomly=select_randomly, **options)
+        csp.share_structure(self)
+        for name, value in givens.items():
+            csp.set_domain(name, [value])
+        return csp
+
+    def share_structure(self, template):
+        """Use the variables, domains and constraints of 'template',
+        with a copy of its domains, for instantiate.
+        """
+        self.variables = template.variables
+        self.domains = copy.copy(template.domains)
+        self.constraints = template.constraints
+        self.all_different = template.all_different
+        # fill the arc lists once, for every instance
+        template.get_all_arcs()
+        self.arcs = template.arcs
+        self.neighboring_arcs = template.neighboring_arcs
+        self.support_lists = template.support_lists
+        self.pair_sets = template.pair_sets
+        self.shared = True
+
+    def unshare(self):
+        """Copy the tables shared with the template by instantiate, before
+        this CSP changes them. The supports are built again on use.
+        """
+        if not self.shared:
+            return
+        self.shared = False
+        self.variables = list(self.variables)
+        self.constraints = {var: dict(arcs)
+                            for var, arcs in self.constraints.items()}
+        self.all_different = list(self.all_different)
+        self.arcs = None
+        self.neighboring_arcs = {}
+        self.support_lists = {}
+        self.pair_sets = {}
+
+    def set_domain(self, name, domain):
+        """Replace the domain of the variable 'name'."""
+        self.domains[name] = list(domain)
 
     def backtracking_search(self):
         """This functions starts the CSP solver and returns the found
         solution.
         """
+        assignment = self.start_search()
+        if assignment is None:
+            return False
+
+        # Call backtrack with the partial assignment 'assignment'
+        return self.backtrack(assignment)
+
+    def solutions(self):
+        """Generate every solution of the CSP, in the order in which
+        backtrack would find them, in the same format as
+        backtracking_search. Stop iterating to stop the search.
+        """
+        assignment = self.start_search()
+        if assignment is None:
+            return iter(())
+        return self.search_all(assignment)
+
+    def count_solutions(self, limit=None):
+        """Count the solutions of the CSP, stopping at 'limit' if given.
+        With a limit of 2, this tells whether the solution is unique.
+        """
+        count = 0
+        for _ in self.solutions():
+            count += 1
+            if count == limit:
+                break
+        return count
+
+    def start_search(self):
+        """Set up a new search, and return the initial assignment with the
+        values that are not arc-consistent removed, or None if that
+        leaves a variable without values.
+        """
         # Make a so-called "deep copy" of the dictionary containing the
         # domains of the CSP variables. The deep copy is required to
         # ensure that any changes made to 'assignment' does not have any
         # side effects elsewhere.
         assignment = copy.deepcopy(self.domains)
+        self.trail = [] if self.use_trail else None
+        self.buckets = None
+        self.order = {var: i for i, var in enumerate(self.variables)}
 
         # Run AC-3 on all constraints in the CSP, to weed out all of the
         # values that are not arc-consistent to begin with
         # input: {}, [(x,y),...]
-        self.inference(assignment, self.get_all_arcs())
+        if not self.inference(assignment, self.get_all_arcs()):
+            return None
 
-        # Call backtrack with the partial assignment 'assignment'
-        return self.backtrack(assignment)
+        if self.variable_ordering == 'mrv':
+            self.buckets = [set() for _ in range(self.max_domain_size() + 1)]
+            for var in self.variables:
+                self.buckets[self.domain_size(assignment, var)].add(var)
+        return assignment
 
     def backtrack(self, assignment):
         """The function 'Backtrack' from the pseudocode in the
@@ -121,31 +325,179 @@ class CSP:
         should have a clean slate and not see any traces of the old
         assignments and inferences that took place in previous
         iterations of the loop.
+
+        With 'use_trail', every change is recorded on self.trail instead,
+        and undone after an iteration that failed, so nothing is copied.
+        The same values are tried in the same order either way.
         """
         self.calls += 1
-        # check whether assignments have 1 variable each => complete
-        complete = True
-        for key in assignment.keys():
-            if len(assignment[key]) != 1:
-                complete = False
-                # break, or the program will look through the entire domain
-                # in every call
-                break
-        if complete:
+        if self.is_complete(assignment):
             return assignment
 
+        for domain_copy in self.branches(assignment):
+            result = self.backtrack(domain_copy)
+            if result:
+                return result
+        self.failure += 1
+        if self.failure_limit is not None and \
+                self.failure >= self.failure_limit:
+            raise RestartSearch()
+        return False
+
+    def restarting_search(self, unit=10):
+        """backtracking_search with restarts: the i-th run gives up after
+        'unit' times the i-th term of the Luby sequence failures, and the
+        search starts over. Only useful when the runs differ, through
+        'select_randomly' or the constraint weights of 'domwdeg', which
+        are kept across runs. The limits keep growing, so the search is
+        still complete.
+        """
+        self.restarts = 0
+        try:
+            while True:
+                self.failure_limit = self.failure + unit * luby(
+                    self.restarts + 1)
+                try:
+                    return self.backtracking_search()
+                except RestartSearch:
+                    self.restarts += 1
+        finally:
+            self.failure_limit = None
+
+    def search_all(self, assignment):
+        """Generate every solution below the partial assignment
+        'assignment', like backtrack but without stopping at the first
+        one. A call counts as a failure when it leads to no solution.
+        """
+        self.calls += 1
+        if self.is_complete(assignment):
+            yield self.solution(assignment)
+            return
+
+        found = False
+        for domain_copy in self.branches(assignment):
+            for solution in self.search_all(domain_copy):
+                found = True
+                yield solution
+        if not found:
+            self.failure += 1
+
+    def branches(self, assignment):
+        """Generate the assignments to search below 'assignment': one for
+        every value of the selected variable that inference doesn't rule
+        out, each with a clean slate (see backtrack).
+        """
         unassigned = self.select_unassigned_variable(assignment)
         for value in self.order_domain_values(assignment, unassigned):
-            domain_copy = copy.deepcopy(assignment)
-            domain_copy[unassigned] = [value]
-            #  queue = self.get_all_neighboring_arcs(unassigned)
-            queue = self.get_all_arcs()
+            if self.trail is None:
+                domain_copy = self.copy_assignment(assignment)
+                buckets = self.copy_buckets()
+            else:
+                domain_copy = assignment
+                mark = len(self.trail)
+            self.assign(domain_copy, unassigned, value)
+            if self.propagation == 'full':
+                queue = self.get_all_arcs()
+            else:
+                # the rest was arc consistent already, so only the arcs
+                # into the assigned variable can lead to changes
+                queue = self.get_all_neighboring_arcs(unassigned)
             if self.inference(domain_copy, queue):
-                result = self.backtrack(domain_copy)
-                if result:
-                    return result
-        self.failure += 1
-        return False
+                yield domain_copy
+            if self.trail is not None:
+                self.undo(assignment, mark)
+            else:
+                self.buckets = buckets
+
+    def solution(self, assignment):
+        """Get a complete 'assignment' as a solution in the format of
+        backtracking_search, safe to keep while the search goes on.
+        """
+        return {var: list(values) for var, values in assignment.items()}
+
+    def is_complete(self, assignment):
+        """Check whether every variable in 'assignment' has exactly one
+        value left.
+        """
+        for key in assignment.keys():
+            if len(assignment[key]) != 1:
+                # break, or the program will look through the entire domain
+                # in every call
+                return False
+        return True
+
+    def copy_assignment(self, assignment):
+        """Copy 'assignment', so that changes to the copy have no side
+        effects on it.
+        """
+        return copy.deepcopy(assignment)
+
+    def assign(self, assignment, var, value):
+        """Reduce the legal values of 'var' in 'assignment' to 'value'."""
+        if self.trail is not None:
+            # the old list is kept as it is, to be put back on undo
+            self.trail.append((var, assignment[var]))
+        self.resized(var, len(assignment[var]), 1)
+        assignment[var] = [value]
+
+    def remove_value(self, assignment, var, value):
+        """Remove 'value' from the legal values of 'var' in 'assignment'."""
+        values = assignment[var]
+        if self.trail is not None:
+            self.trail.append((var, values.index(value), value))
+        self.resized(var, len(values), len(values) - 1)
+        values.remove(value)
+
+    def resized(self, var, old_size, new_size):
+        """Move 'var' to the bucket of its new domain size, if buckets
+        are kept.
+        """
+        if self.buckets is not None and old_size != new_size:
+            self.buckets[old_size].discard(var)
+            self.buckets[new_size].add(var)
+
+    def copy_buckets(self):
+        """Copy the buckets, to put them back after a failed iteration
+        of backtrack when it works on copies of the assignment.
+        """
+        if self.buckets is None:
+            return None
+        return [set(bucket) for bucket in self.buckets]
+
+    def undo(self, assignment, mark):
+        """Undo the changes recorded on the trail after its first 'mark'
+        entries, latest first.
+        """
+        trail = self.trail
+        while len(trail) > mark:
+            change = trail.pop()
+            if len(change) == 2:
+                var, values = change
+                self.resized(var, self.domain_size(assignment, var),
+                             self.size_of(values))
+                assignment[var] = values
+            else:
+                var, index, value = change
+                self.resized(var, len(assignment[var]),
+                             len(assignment[var]) + 1)
+                assignment[var].insert(index, value)
+
+    def domain_size(self, assignment, var):
+        """Get the number of legal values of 'var' in 'assignment'."""
+        return self.size_of(assignment[var])
+
+    def size_of(self, domain):
+        """Get the number of values in 'domain'."""
+        return len(domain)
+
+    def max_domain_size(self):
+        """Get the size of the largest domain of the CSP."""
+        return max([self.size_of(domain) for domain in
+                    self.initial_domains()] + [1])
+
+    def initial_domains(self):
+        """Get the domains of the variables before the search."""
+        return self.domains.values()
 
     def order_domain_values(self, assignment, unassigned):
         """
@@ -153,8 +505,40 @@ class CSP:
         some of which tried ideas from LCV (least constraining value)
         but these all resulted in more iterations
         therefore, this simply returns the the according list
+
+        With the 'lcv' value ordering, the values are sorted by how many
+        values they rule out for the undecided neighbours, fewest first
+        (ties keep the domain order).
+        """
+        values = self.domain_values(assignment, unassigned)
+        if self.value_ordering != 'lcv':
+            return values
+        neighbors = [other for other in self.constraints[unassigned]
+                     if self.domain_size(assignment, other) > 1]
+        return sorted(values, key=lambda value: sum(
+            self.conflicts(assignment, unassigned, value, other)
+            for other in neighbors))
+
+    def domain_values(self, assignment, var):
+        """Get the legal values of 'var' in 'assignment', in order."""
+        return assignment[var]
+
+    def conflicts(self, assignment, var, value, other):
+        """Count the legal values of 'other' that the constraint between
+        'var' and 'other' rules out when 'var' is 'value'.
+        """
+        pairs = self.pair_set(var, other)
+        return sum(1 for y in assignment[other] if (value, y) not in pairs)
+
+    def pair_set(self, i, j):
+        """Get the legal value pairs of the constraint (i, j) as a set,
+        built on first use.
         """
-        return assignment[unassigned]
+        pairs = self.pair_sets.get((i, j))
+        if pairs is None:
+            pairs = set(self.constraints[i][j])
+            self.pair_sets[i, j] = pairs
+        return pairs
 
     def select_unassigned_variable(self, assignment):
         """The function 'Select-Unassigned-Variable' from the pseudocode
@@ -169,35 +553,252 @@ class CSP:
         Both are based on the idea of minimum remaining value (MRV),
         however, as we can guarantee there to be a set with 2 remaining values,
         2 will always be present and will always be the minimum.
+        That guarantee only holds for Sudoku, so when no variable has 2
+        values left, the first one with the fewest values is used.
+
+        The 'mrv' and 'domwdeg' variable orderings are the real
+        heuristics, see select_mrv and select_domwdeg.
         """
+        if self.variable_ordering == 'mrv':
+            return self.select_mrv(assignment)
+        if self.variable_ordering == 'domwdeg':
+            return self.select_domwdeg(assignment)
         if self.select_randomly:
-            return choice(filter(lambda var:
-                                 len(assignment[var]) == 2,
-                                 assignment.keys()))
+            candidates = [var for var in self.variables
+                          if self.domain_size(assignment, var) == 2]
+            if candidates:
+                return self.random.choice(candidates)
         else:
-            for var in assignment.keys():
-                if len(assignment[var]) == 2:
+            for var in self.variables:
+                if self.domain_size(assignment, var) == 2:
                     return var
+        undecided = [var for var in self.variables
+                     if self.domain_size(assignment, var) > 1]
+        return min(undecided,
+                   key=lambda var: self.domain_size(assignment, var))
+
+    def select_mrv(self, assignment):
+        """Minimum remaining values, with the degree heuristic for ties:
+        a variable of the smallest non-trivial domain size, with the most
+        undecided neighbours. The buckets give the candidates without
+        looking at the other variables. Remaining ties go to the first
+        variable, or a random one with 'select_randomly'.
+        """
+        for bucket in self.buckets[2:]:
+            if bucket:
+                best = max(self.degree(assignment, var) for var in bucket)
+                candidates = sorted(
+                    (var for var in bucket
+                     if self.degree(assignment, var) == best),
+                    key=self.order.get)
+                if self.select_randomly:
+                    return self.random.choice(candidates)
+                return candidates[0]
+
+    def degree(self, assignment, var):
+        """Count the undecided neighbours of 'var'."""
+        return sum(1 for other in self.constraints[var]
+                   if self.domain_size(assignment, other) > 1)
+
+    def select_domwdeg(self, assignment):
+        """dom/wdeg: the undecided variable with the lowest ratio of
+        domain size to weighted degree, the sum of the weights of its
+        constraints to undecided neighbours. A constraint gets heavier
+        every time it empties a domain, so the search turns to the parts
+        of the problem that fail the most.
+        """
+        best, best_ratio = None, None
+        for var in self.variables:
+            size = self.domain_size(assignment, var)
+            if size < 2:
+                continue
+            weighted = sum(self.weights.get((var, other), 1)
+                           for other in self.constraints[var]
+                           if self.domain_size(assignment, other) > 1)
+            ratio = size / max(weighted, 1)
+            if best is None or ratio < best_ratio or \
+                    (self.select_randomly and ratio == best_ratio and
+                     self.random.choice((True, False))):
+                best, best_ratio = var, ratio
+        return best
+
+    def add_weight(self, i, j):
+        """Make the constraint between 'i' and 'j' heavier, for dom/wdeg."""
+        weight = self.weights.get((i, j), 1) + 1
+        self.weights[i, j] = weight
+        self.weights[j, i] = weight
 
     def inference(self, assignment, queue):
         """The function 'AC-3' from the pseudocode in the textbook.
         'assignment' is the current partial assignment, that contains
         the lists of legal values for each undecided variable. 'queue'
         is the initial queue of arcs that should be visited.
+
+        Unless self.propagation is 'full', the queue is a deque, and an
+        arc that is queued already is not queued again.
+
+        When AC-3 is done, the Alldiff constraints in self.all_different
+        are checked as a whole, and AC-3 runs again from the arcs into
+        the variables that lost values, until neither changes anything.
+        """
+        while True:
+            if self.propagation == 'full':
+                if not self.ac3(assignment, queue):
+                    return False
+            elif not self.propagate(assignment, queue):
+                return False
+            if not self.all_different:
+                return True
+            changed = self.filter_all_different(assignment)
+            if changed is None:
+                return False
+            if not changed:
+                return True
+            if self.propagation == 'full':
+                queue = self.get_all_arcs()
+            else:
+                queue = [arc for var in changed
+                         for arc in self.get_all_neighboring_arcs(var)]
+
+    def ac3(self, assignment, queue):
+        """AC-3 over the list of arcs 'queue', for the 'full'
+        propagation.
         """
+        queue = list(queue)
         #  print('AC3')
         while queue:  # true as long as there are any constraints
             i, j = queue.pop(0)  # remove and return the first tuple
             if self.revise(assignment, i, j):
                 if not assignment[i]:  # if there are no items in the domain
+                    self.add_weight(i, j)
                     return False
                 neighbors = self.get_all_neighboring_arcs(i)
                 for n in neighbors:
                     # equivalent of removing j from the set of i's neighbors
-                    if j not in n[0]:
+                    if n[0] != j:
                         queue.append((n[0], i))
         return True
 
+    def propagate(self, assignment, queue):
+        """AC-3 over a deque of arcs, with a set of the arcs in it, for
+        the 'ac3' and 'ac2001' propagations. Reaches the same domains as
+        the 'full' inference from the same queue.
+        """
+        # dict.fromkeys drops repeated arcs and keeps the order
+        queue = deque(dict.fromkeys(queue))
+        queued = set(queue)
+        if self.propagation == 'ac2001':
+            revise = self.revise_2001
+        else:
+            revise = self.revise
+        while queue:
+            arc = queue.popleft()
+            queued.discard(arc)
+            i, j = arc
+            if revise(assignment, i, j):
+                if not assignment[i]:
+                    self.add_weight(i, j)
+                    return False
+                for k, _ in self.get_all_neighboring_arcs(i):
+                    if k != j and (k, i) not in queued:
+                        queued.add((k, i))
+                        queue.append((k, i))
+        return True
+
+    def filter_all_different(self, assignment):
+        """Check every Alldiff constraint in self.all_different against
+        'assignment', and remove the values it rules out. Returns the
+        variables that lost values, or None when a constraint can't be
+        satisfied any more.
+        """
+        changed = {}
+        for variables, reasoning in self.all_different:
+            domains = {var: set(self.domain_values(assignment, var))
+                       for var in variables}
+            for var in variables:
+                if var in changed:
+                    domains[var] = changed[var]
+            if not self.filter_domains(domains, reasoning, changed):
+                return None
+        for var, values in changed.items():
+            self.keep_values(assignment, var, values)
+        return list(changed)
+
+    def filter_domains(self, domains, reasoning, changed):
+        """Remove the values that the Alldiff constraint between the
+        variables of 'domains', a dictionary of value sets, rules out
+        with 'reasoning'. The reduced sets are put in 'changed' as well.
+        Returns False if the constraint can't be satisfied.
+
+        The hidden rules need every value to be used, so they only run
+        when there are as many values as variables, like in Sudoku.
+        Finding a subset of k of the u undecided variables also finds
+        the other u - k, so subsets up to half their size are enough.
+        """
+        union = set().union(*domains.values())
+        if len(union) < len(domains):
+            return False
+        hidden = len(union) == len(domains)
+        undecided = [var for var in domains if len(domains[var]) > 1]
+        # the values of the decided variables, which the other variables
+        # may still have when an earlier constraint decided them
+        decided = set()
+        for var in domains:
+            if len(domains[var]) == 1:
+                if domains[var] & decided:
+                    return False
+                decided |= domains[var]
+        largest = len(undecided) // 2 if reasoning == 'subsets' else 1
+
+        def restrict(var, values):
+            values = domains[var] & values
+            if values != domains[var]:
+                domains[var] = changed[var] = values
+            return values
+
+        for k in range(1, largest + 1):
+            if k > 1:
+                # naked subsets: k variables with k values between them
+                candidates = [var for var in undecided
+                              if 1 < len(domains[var]) <= k]
+                for subset in itertools.combinations(candidates, k):
+                    values = set().union(*(domains[var] for var in subset))
+                    if len(values) < k:
+                        return False
+                    if len(values) > k:
+                        continue
+                    for var in undecided:
+                        if var not in subset and domains[var] & values:
+                            if not restrict(var, union - values):
+                                return False
+            if not hidden:
+                continue
+            # hidden subsets: k values that fit only k variables
+            places = {value: set() for value in union - decided}
+            for var in undecided:
+                for value in domains[var] - decided:
+                    places[value].add(var)
+            candidates = [value for value in places
+                          if len(places[value]) <= k]
+            for values in itertools.combinations(candidates, k):
+                subset = set().union(*(places[value] for value in values))
+                if len(subset) < k:
+                    return False
+                if len(subset) > k:
+                    continue
+                for var in subset:
+                    if not restrict(var, set(values)):
+                        return False
+        return True
+
+    def keep_values(self, assignment, var, values):
+        """Remove the legal values of 'var' in 'assignment' that are not
+        in the set 'values'.
+        """
+        for value in list(assignment[var]):
+            if value not in values:
+                self.remove_value(assignment, var, value)
+
     def revise(self, assignment, i, j):
         """The function 'Revise' from the pseudocode in the textbook.
         'assignment' is the current partial assignment, that contains
@@ -217,21 +818,72 @@ class CSP:
                     constraint_satisfied = True
                     break
             if not constraint_satisfied:
-                assignment[i].remove(x)
+                self.remove_value(assignment, i, x)
+                revised = True
+        return revised
+
+    def revise_2001(self, assignment, i, j):
+        """'Revise' as in AC-2001: a value of i keeps its support as long
+        as the last support found for it is still legal for j, and the
+        search for a new one continues after it. The pointers are not
+        undone on backtracking, so the search wraps around to the values
+        before the last support, which keeps it correct when earlier
+        values have come back.
+        """
+        supports = self.support_list(i, j)
+        legal = set(assignment[j])
+        last_support = self.last_support
+        revised = False
+        for x in list(assignment[i]):
+            candidates = supports[x]
+            last = last_support.get((i, j, x), 0)
+            if last < len(candidates) and candidates[last] in legal:
+                continue
+            for k in itertools.chain(range(last + 1, len(candidates)),
+                                     range(min(last, len(candidates)))):
+                if candidates[k] in legal:
+                    last_support[i, j, x] = k
+                    break
+            else:
+                self.remove_value(assignment, i, x)
                 revised = True
         return revised
 
+    def support_list(self, i, j):
+        """Get the supports of every value of i in the constraint (i, j),
+        as lists in the order of the domain of j, built on first use.
+        """
+        supports = self.support_lists.get((i, j))
+        if supports is None:
+            pairs = self.pair_set(i, j)
+            supports = {x: [y for y in self.domains[j] if (x, y) in pairs]
+                        for x in self.domains[i]}
+            self.support_lists[i, j] = supports
+        return supports
 
-def create_map_coloring_csp():
+    def compile_supports(self):
+        """Build the pair sets and support lists of every constraint up
+        front, for a template whose instances share them.
+        """
+        for i, j in self.get_all_arcs():
+            self.support_list(i, j)
+
+
+def create_map_coloring_csp(compact=False, **options):
     """Instantiate a CSP representing the map coloring problem from the
     textbook. This can be useful for testing your CSP solver as you
-    develop your code.
+    develop your code. With 'compact', the CSP is a bitcsp.BitCSP. The
+    other options are passed on to the CSP.
     """
-    csp = CSP()
+    colors = ['red', 'green', 'blue']
+    if compact:
+        from bitcsp import BitCSP
+        csp = BitCSP(values=colors, **options)
+    else:
+        csp = CSP(**options)
     states = ['WA', 'NT', 'Q', 'NSW', 'V', 'SA', 'T']
     edges = {'SA': ['WA', 'NT', 'Q', 'NSW', 'V'],
              'NT': ['WA', 'Q'], 'NSW': ['Q', 'V']}
-    colors = ['red', 'green', 'blue']
     for state in states:
         csp.add_variable(state, colors)
     for state, other_states in edges.items():
@@ -241,34 +893,120 @@ def create_map_coloring_csp():
     return csp
 
 
-def create_sudoku_csp(filename, select_randomly=True):
+# The values of the cells of an NxN board, the first N of these
+SYMBOLS = '123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+def box_shape(n):
+    """Get the (rows, columns) of the boxes of an NxN board: as close to
+    square as possible, with no more rows than columns, like 2x3 for 6x6.
+    """
+    rows = int(n ** 0.5)
+    while n % rows:
+        rows -= 1
+    return rows, n // rows
+
+
+def sudoku_symbols(n):
+    """Get the values of an NxN board, '1' to '9' and then 'A' onwards."""
+    if not 1 <= n <= len(SYMBOLS):
+        raise ValueError('unsupported board size: %d' % n)
+    return SYMBOLS[:n]
+
+
+def create_sudoku_csp(filename, select_randomly=True, compact=False,
+                      dlx=False, all_different='pairwise', **options):
     """Instantiate a CSP representing the Sudoku board found in the text
-    file named 'filename' in the current directory.
+    file named 'filename' in the current directory. With 'compact', the
+    CSP is a bitcsp.BitCSP, which finds the same solution with the same
+    number of calls, only faster. With 'dlx', it is a dlx.SudokuDLX exact
+    cover solver instead, with the same search methods and solution
+    format, which ignores the other options. 'all_different' is the
+    reasoning of the row, column and box constraints, one of
+    ALL_DIFFERENT_REASONINGS. The other options, like use_trail, are
+    passed on to the CSP.
     """
-    csp = CSP(select_randomly)
-    board = map(lambda x: x.strip(), open(filename, 'r'))
+    with open(filename, 'r') as f:
+        board = [line.strip() for line in f if line.strip()]
+    return create_sudoku_csp_from_board(board, select_randomly, compact, dlx,
+                                        all_different, **options)
 
-    for row in range(9):
-        for col in range(9):
-            if board[row][col] == '0':
-                csp.add_variable('%d-%d' % (row, col), map(str, range(1, 10)))
-            else:
-                csp.add_variable('%d-%d' % (row, col), [board[row][col]])
 
-    for row in range(9):
+def create_sudoku_csp_from_board(board, select_randomly=True, compact=False,
+                                 dlx=False, all_different='pairwise',
+                                 **options):
+    """Same as create_sudoku_csp, for a board given as a list of N strings
+    of N values, with 0 for the empty cells. The boxes are shaped by
+    box_shape(N) and the values are sudoku_symbols(N), so a 9x9 board has
+    3x3 boxes and the digits 1 to 9.
+
+    The constraints only depend on N, so they are compiled once into a
+    template by sudoku_template, and the board only sets the domains of
+    its givens.
+    """
+    n = len(board)
+    if dlx:
+        from dlx import create_sudoku_dlx
+        return create_sudoku_dlx(board)
+    symbols = sudoku_symbols(n)
+    givens = {}
+    for row in range(n):
+        if len(board[row]) != n:
+            raise ValueError('row %d of a %dx%d board has %d cells' %
+                             (row + 1, n, n, len(board[row])))
+        for col in range(n):
+            value = board[row][col]
+            if value in '0.':
+                continue
+            if value not in symbols:
+                raise ValueError('not a value of a %dx%d board: %s' %
+                                 (n, n, value))
+            givens['%d-%d' % (row, col)] = value
+    template = sudoku_template(n, compact, all_different)
+    return template.instantiate(givens, select_randomly, **options)
+
+
+# The CSPs of empty boards built by sudoku_template, by (N, compact,
+# all_different)
+_sudoku_templates = {}
+
+
+def sudoku_template(n, compact=False, all_different='pairwise'):
+    """Get the CSP of an empty NxN board, built on first use. Boards of
+    that size are solved with template.instantiate(givens), see
+    create_sudoku_csp_from_board.
+    """
+    key = n, compact, all_different
+    if key in _sudoku_templates:
+        return _sudoku_templates[key]
+    box_rows, box_cols = box_shape(n)
+    symbols = list(sudoku_symbols(n))
+    if compact:
+        from bitcsp import BitCSP
+        csp = BitCSP(values=symbols)
+    else:
+        csp = CSP()
+
+    for row in range(n):
+        for col in range(n):
+            csp.add_variable('%d-%d' % (row, col), symbols)
+
+    for row in range(n):
         csp.add_all_different_constraint(
-            ['%d-%d' % (row, col) for col in range(9)])
-    for col in range(9):
+            ['%d-%d' % (row, col) for col in range(n)], all_different)
+    for col in range(n):
         csp.add_all_different_constraint(
-            ['%d-%d' % (row, col) for row in range(9)])
-    for box_row in range(3):
-        for box_col in range(3):
+            ['%d-%d' % (row, col) for row in range(n)], all_different)
+    for box_row in range(0, n, box_rows):
+        for box_col in range(0, n, box_cols):
             cells = []
-            for row in range(box_row * 3, (box_row + 1) * 3):
-                for col in range(box_col * 3, (box_col + 1) * 3):
+            for row in range(box_row, box_row + box_rows):
+                for col in range(box_col, box_col + box_cols):
                     cells.append('%d-%d' % (row, col))
-            csp.add_all_different_constraint(cells)
+            csp.add_all_different_constraint(cells, all_different)
 
+    csp.compile_supports()
+    _sudoku_templates[key] = csp
     return csp
 
 
@@ -277,26 +1015,31 @@ def print_sudoku_solution(solution):
     the method CSP.backtracking_search(), into a human readable
     representation.
     """
-    for row in range(9):
-        for col in range(9):
-            print solution['%d-%d' % (row, col)][0],
-            if col == 2 or col == 5:
-                print '|',
-        print
-        if row == 2 or row == 5:
-            print '------+-------+------'
+    n = int(round(len(solution) ** 0.5))
+    box_rows, box_cols = box_shape(n)
+    for row in range(n):
+        for col in range(n):
+            print(solution['%d-%d' % (row, col)][0], end=' ')
+            if col % box_cols == box_cols - 1 and col != n - 1:
+                print('|', end=' ')
+        print()
+        if row % box_rows == box_rows - 1 and row != n - 1:
+            widths = [2 * box_cols + 1] * (n // box_cols)
+            widths[0] = widths[-1] = 2 * box_cols
+            print('+'.join('-' * width for width in widths))
 
 
 def solve_board(board, random_choices):
     csp = create_sudoku_csp('sudokus/' + board + '.txt', random_choices)
     assignment = csp.backtracking_search()
-    print '~ Random? ', random_choices, '=> failure: ',
-    print csp.failure, 'total: ', csp.calls
+    print('~ Random? ', random_choices, '=> failure: ', end=' ')
+    print(csp.failure, 'total: ', csp.calls)
     if not random_choices:
         print_sudoku_solution(assignment)
 
 
-for board in ['easy', 'medium', 'hard', 'veryhard', 'extreme']:
-    print 'Solving board: ' + board
-    solve_board(board, random_choices=False)
-    #  solve_board(board, random_choices=True)
+if __name__ == '__main__':
+    for board in ['easy', 'medium', 'hard', 'veryhard', 'extreme']:
+        print('Solving board: ' + board)
+        solve_board(board, random_choices=False)
+        #  solve_board(board, random_choices=True)
@@ -0,0 +1,153 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from assignment5 import ALL_DIFFERENT_REASONINGS, PROPAGATIONS, \
+    VALUE_ORDERINGS, VARIABLE_ORDERINGS, create_sudoku_csp_from_board
+
+
+def read_puzzles(lines):
+    """Get the puzzles from an iterable of lines, one puzzle of 81 cells
+    per line, row by row. Empty cells are 0 or '.'. Blank lines are
+    skipped. The lines are read one at a time, as they are needed.
+    """
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def parse_puzzle(puzzle):
+    """Convert an 81 character puzzle into the nine rows used by
+    create_sudoku_csp_from_board.
+    """
+    if len(puzzle) != 81:
+        raise ValueError('a puzzle has 81 cells, not %d' % len(puzzle))
+    puzzle = puzzle.replace('.', '0')
+    if not puzzle.isdigit():
+        raise ValueError('a puzzle only has the digits 0 to 9 or .')
+    return [puzzle[row * 9:(row + 1) * 9] for row in range(9)]
+
+
+def solve_puzzle(job):
+    """Solve one (puzzle, options) job, and return the result as a
+    dictionary: the puzzle, its solution as 81 digits (None if it has
+    none), the calls and failure counts and the time, or the error if
+    the puzzle could not be read.
+    """
+    puzzle, options = job
+    result = {'puzzle': puzzle}
+    started = time.perf_counter()
+    try:
+        board = parse_puzzle(puzzle)
+    except ValueError as e:
+        result['error'] = str(e)
+        return result
+    csp = create_sudoku_csp_from_board(board, False, **options)
+    solution = csp.backtracking_search()
+    result['solution'] = ''.join(
+        solution['%d-%d' % (row, col)][0]
+        for row in range(9) for col in range(9)) if solution else None
+    result['calls'] = csp.calls
+    result['failure'] = csp.failure
+    result['time'] = time.perf_counter() - started
+    return result
+
+
+def solve_stream(puzzles, options=None, workers=None, chunksize=16,
+                 window=None):
+    """Solve the puzzles over a process pool, and yield the results in
+    input order. At most 'window' puzzles are read ahead of the results,
+    so memory stays the same however many puzzles there are.
+    """
+    options = options or {}
+    jobs = ((puzzle, options) for puzzle in puzzles)
+    if workers == 1:
+        for job in jobs:
+            yield solve_puzzle(job)
+        return
+    with Pool(workers) as pool:
+        if window is None:
+            window = chunksize * 4 * (workers or os.cpu_count() or 1)
+        while True:
+            batch = list(itertools.islice(jobs, window))
+            if not batch:
+                break
+            for result in pool.imap(solve_puzzle, batch, chunksize):
+                yield result
+
+
+def write_results(puzzles, output, options=None, workers=None,
+                  chunksize=16):
+    """Solve the puzzles and write one JSON line each to the file object
+    'output'. Returns (count, elapsed).
+    """
+    count = 0
+    started = time.perf_counter()
+    for result in solve_stream(puzzles, options, workers, chunksize):
+        output.write(json.dumps(result) + '\n')
+        count += 1
+    return count, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Solves Sudoku puzzles, one per line of 81 cells, and '
+                    'writes the solutions with their stats as JSON lines, '
+                    'in input order.')
+    parser.add_argument('input', nargs='?', default='-',
+                        help='puzzle file (default: standard input)')
+    parser.add_argument('-o', '--output', default='-',
+                        help='JSON lines file to write '
+                             '(default: standard output)')
+    parser.add_argument('--compact', action='store_true',
+                        help='use the bitset BitCSP')
+    parser.add_argument('--dlx', action='store_true',
+                        help='use the exact cover solver instead of the CSP')
+    parser.add_argument('--trail', action='store_true',
+                        help='backtrack with a trail instead of copies')
+    parser.add_argument('--propagation', choices=PROPAGATIONS,
+                        default='full', help='AC-3 algorithm')
+    parser.add_argument('--variable-ordering', choices=VARIABLE_ORDERINGS,
+                        default='first', help='variable ordering heuristic')
+    parser.add_argument('--value-ordering', choices=VALUE_ORDERINGS,
+                        default='domain', help='value ordering heuristic')
+    parser.add_argument('--all-different', choices=ALL_DIFFERENT_REASONINGS,
+                        default='pairwise',
+                        help='reasoning of the row, column and box '
+                             'constraints')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='worker processes (default: all cores)')
+    parser.add_argument('--chunksize', type=int, default=16,
+                        help='puzzles sent to a worker at a time')
+    args = parser.parse_args(argv)
+
+    options = {
+        'compact': args.compact,
+        'dlx': args.dlx,
+        'use_trail': args.trail,
+        'propagation': args.propagation,
+        'variable_ordering': args.variable_ordering,
+        'value_ordering': args.value_ordering,
+        'all_different': args.all_different,
+    }
+    source = sys.stdin if args.input == '-' else open(args.input)
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        count, elapsed = write_results(read_puzzles(source), output, options,
+                                       args.workers, args.chunksize)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    sys.stderr.write('Solved %d puzzles in %.3fs (%.1f puzzles/s)\n' %
+                     (count, elapsed, count / elapsed if elapsed else 0.0))
+
+
+if __name__ == '__main__':
+    main()
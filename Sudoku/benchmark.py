@@ -0,0 +1,182 @@
+import argparse
+import itertools
+import os
+import time
+
+from assignment5 import ALL_DIFFERENT_REASONINGS, PROPAGATIONS, \
+    VALUE_ORDERINGS, VARIABLE_ORDERINGS, create_sudoku_csp, \
+    create_sudoku_csp_from_board
+from batch import parse_puzzle, read_puzzles
+
+
+def list_boards(directory):
+    """Get the 9x9 board files in 'directory', sorted by name. Other
+    files, like the 16x16 4.txt, are left out.
+    """
+    boards = []
+    for name in sorted(os.listdir(directory)):
+        filename = os.path.join(directory, name)
+        with open(filename) as f:
+            rows = [line.strip() for line in f if line.strip()]
+        if len(rows) == 9 and all(len(row) == 9 and row.isdigit()
+                                  for row in rows):
+            boards.append(filename)
+    return boards
+
+
+def time_solve(filename, repeat, **options):
+    """Solve a board 'repeat' times and return (best time, calls,
+    failure). The time includes building the CSP.
+    """
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        csp = create_sudoku_csp(filename, False, **options)
+        csp.backtracking_search()
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, csp.calls, csp.failure
+
+
+def compare_propagations(boards, propagations, compact=False,
+                         use_trail=False, repeat=3, **options):
+    """Solve every board with every propagation, and compare the times
+    to the first propagation. The other options, like the orderings, are
+    passed on to the CSP.
+    """
+    print('%-24s %-8s %10s %7s %8s %8s' %
+          ('board', 'prop', 'time (ms)', 'calls', 'failure', 'speedup'))
+    for filename in boards:
+        baseline = None
+        for propagation in propagations:
+            elapsed, calls, failure = time_solve(
+                filename, repeat, compact=compact, use_trail=use_trail,
+                propagation=propagation, **options)
+            if baseline is None:
+                baseline = elapsed
+            print('%-24s %-8s %10.2f %7d %8d %7.2fx' %
+                  (os.path.basename(filename), propagation, elapsed * 1000,
+                   calls, failure, baseline / elapsed))
+
+
+def summary(values):
+    """Get the (min, median, 90th percentile, max, mean) of 'values'."""
+    values = sorted(values)
+    n = len(values)
+    return (values[0], values[(n - 1) // 2], values[(n - 1) * 9 // 10],
+            values[-1], sum(values) / float(n))
+
+
+def run_corpus(puzzles, configurations):
+    """Solve every puzzle with every configuration (a dictionary of CSP
+    options), and print the distributions of calls, failure and time per
+    configuration and number of givens.
+    """
+    grades = {}
+    for puzzle in puzzles:
+        grades.setdefault(81 - puzzle.replace('.', '0').count('0'),
+                          []).append(puzzle)
+    for options in configurations:
+        print(' '.join('%s=%s' % option for option in options.items()))
+        print('  %6s %4s  %-26s  %-28s  %-30s' %
+              ('givens', 'n', 'calls min/med/p90/max/mean',
+               'failure min/med/p90/max/mean',
+               'time ms min/med/p90/max/mean'))
+        # the first CSP of a configuration builds the template of the
+        # board size, which is not part of solving a puzzle
+        create_sudoku_csp_from_board(parse_puzzle(puzzles[0]), **options)
+        for givens in sorted(grades, reverse=True):
+            calls, failure, times = [], [], []
+            for puzzle in grades[givens]:
+                started = time.perf_counter()
+                csp = create_sudoku_csp_from_board(parse_puzzle(puzzle),
+                                                   **options)
+                csp.backtracking_search()
+                times.append((time.perf_counter() - started) * 1000)
+                calls.append(csp.calls)
+                failure.append(csp.failure)
+            print('  %6d %4d  %-26s  %-28s  %-30s' %
+                  (givens, len(calls),
+                   '%d/%d/%d/%d/%.1f' % summary(calls),
+                   '%d/%d/%d/%d/%.1f' % summary(failure),
+                   '%.1f/%.1f/%.1f/%.1f/%.1f' % summary(times)))
+
+
+def positive_int(text):
+    """argparse type of the counts that must be at least 1."""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError('must be at least 1')
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Compares the propagation algorithms of the CSP '
+                    'solver on the Sudoku boards.')
+    parser.add_argument('directory', nargs='?', default='sudokus',
+                        help='directory of the boards')
+    parser.add_argument('--compact', action='store_true',
+                        help='use the bitset BitCSP')
+    parser.add_argument('--trail', action='store_true',
+                        help='backtrack with a trail instead of copies')
+    parser.add_argument('--variable-ordering', choices=VARIABLE_ORDERINGS,
+                        action='append',
+                        help='variable ordering heuristic (default first; '
+                             'repeatable with --corpus, default all)')
+    parser.add_argument('--value-ordering', choices=VALUE_ORDERINGS,
+                        action='append',
+                        help='value ordering heuristic (default domain; '
+                             'repeatable with --corpus)')
+    parser.add_argument('--all-different', choices=ALL_DIFFERENT_REASONINGS,
+                        action='append',
+                        help='reasoning of the row, column and box '
+                             'constraints (default pairwise; repeatable '
+                             'with --corpus)')
+    parser.add_argument('-r', '--repeat', type=positive_int, default=3,
+                        help='runs per board, the best one is reported')
+    parser.add_argument('--corpus', metavar='PUZZLES',
+                        help='solve a puzzle file (see generator.py) with '
+                             'every configuration instead, and report the '
+                             'distributions per number of givens')
+    parser.add_argument('--propagation', choices=PROPAGATIONS,
+                        action='append',
+                        help='propagation to run with --corpus '
+                             '(repeatable, default ac3)')
+    parser.add_argument('--random', action='store_true',
+                        help='with --corpus, also run every configuration '
+                             'with select_randomly')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the random choices')
+    args = parser.parse_args(argv)
+    if args.corpus:
+        configurations = [
+            {'select_randomly': select_randomly, 'seed': args.seed,
+             'compact': args.compact,
+             'use_trail': args.trail, 'propagation': propagation,
+             'variable_ordering': variable_ordering,
+             'value_ordering': value_ordering,
+             'all_different': all_different}
+            for select_randomly, propagation, variable_ordering,
+            value_ordering, all_different in itertools.product(
+                (False, True) if args.random else (False,),
+                args.propagation or ['ac3'],
+                args.variable_ordering or VARIABLE_ORDERINGS,
+                args.value_ordering or ['domain'],
+                args.all_different or ['pairwise'])]
+        with open(args.corpus) as f:
+            run_corpus(list(read_puzzles(f)), configurations)
+        return
+    compare_propagations(list_boards(args.directory), PROPAGATIONS,
+                         args.compact, args.trail, args.repeat,
+                         variable_ordering=(args.variable_ordering or
+                                            ['first'])[0],
+                         value_ordering=(args.value_ordering or
+                                         ['domain'])[0],
+                         all_different=(args.all_different or
+                                        ['pairwise'])[0])
+
+
+if __name__ == '__main__':
+    main()
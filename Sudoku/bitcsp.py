@@ -0,0 +1,226 @@
+from assignment5 import CSP
+
+# Constraint type for "the two variables have different values". Revising
+# such an arc only needs the other variable's domain, not a support table.
+NOT_EQUAL = 'not_equal'
+
+
+def bit_values(mask):
+    """Get the positions of the set bits in 'mask', lowest first."""
+    positions = []
+    while mask:
+        low = mask & -mask
+        positions.append(low.bit_length() - 1)
+        mask ^= low
+    return positions
+
+
+class BitCSP(CSP):
+    """A CSP with the same interface as CSP, where variables are integer
+    indices and domains are bitsets.
+
+    The variables are still added and named like in CSP, but inside the
+    solver variable i is the i-th variable added, and its domain is an
+    int whose bit k is set while the k-th value of self.values is legal.
+    A binary constraint is either NOT_EQUAL, or compiled into a list of
+    support masks: self.constraints[i][j][k] has the bits of the values
+    of j that are legal together with value k of i. Revising an arc then
+    takes a few bit operations per value.
+
+    backtracking_search() returns the solution in the same format as CSP,
+    a dictionary from variable name to a list with its single value.
+
+    Finding a support is a single AND with a support mask already, so the
+    'ac2001' propagation revises the arcs the same way as 'ac3' here.
+    """
+
+    def __init__(self, select_randomly=True, values=(), use_trail=False,
+                 propagation='full', variable_ordering='first',
+                 value_ordering='domain', seed=None):
+        CSP.__init__(self, select_randomly, use_trail, propagation,
+                     variable_ordering, value_ordering, seed)
+        # self.domains[i] is the domain bitset of variable i
+        self.domains = []
+        # self.names[i] is the name of variable i
+        self.names = []
+        self.index = {}
+        # self.values[k] is the value of bit k. Values are ordered as
+        # given here, then as first added, which is also the order in
+        # which order_domain_values() tries them.
+        self.values = []
+        self.bits = {}
+        for value in values:
+            self.bit(value)
+
+    def share_structure(self, template):
+        CSP.share_structure(self, template)
+        self.names = template.names
+        self.index = template.index
+        self.values = template.values
+        self.bits = template.bits
+
+    def unshare(self):
+        if self.shared:
+            self.names = list(self.names)
+            self.index = dict(self.index)
+            self.values = list(self.values)
+            self.bits = dict(self.bits)
+        CSP.unshare(self)
+
+    def compile_supports(self):
+        # the support masks are compiled with the constraints already
+        pass
+
+    def set_domain(self, name, domain):
+        mask = 0
+        for value in domain:
+            mask |= self.bits[value]
+        self.domains[self.index[name]] = mask
+
+    def bit(self, value):
+        """Get the bit of 'value', giving it the next free one if it is
+        new.
+        """
+        if value not in self.bits:
+            self.bits[value] = 1 << len(self.values)
+            self.values.append(value)
+        return self.bits[value]
+
+    def add_variable(self, name, domain):
+        self.unshare()
+        i = len(self.names)
+        self.names.append(name)
+        self.index[name] = i
+        self.variables.append(i)
+        mask = 0
+        for value in domain:
+            mask |= self.bit(value)
+        self.domains.append(mask)
+        self.constraints[i] = {}
+
+    def supports(self, i, j, filter_function):
+        """Compile the legal value pairs of the current domains of 'i' and
+        'j' into support masks, as described in the class docstring.
+        """
+        values = self.values
+        table = [0] * len(values)
+        for k in bit_values(self.domains[i]):
+            for m in bit_values(self.domains[j]):
+                if filter_function(values[k], values[m]):
+                    table[k] |= 1 << m
+        return table
+
+    def add_constraint_one_way(self, i, j, filter_function):
+        """Same as CSP.add_constraint_one_way(), with 'i' and 'j' given by
+        name. Adding a second constraint on the same arc keeps only the
+        value pairs legal in both.
+        """
+        self.unshare()
+        i, j = self.index[i], self.index[j]
+        table = self.supports(i, j, filter_function)
+        old = self.constraints[i].get(j)
+        if old is NOT_EQUAL:
+            old = self.supports(i, j, lambda x, y: x != y)
+        if old is not None:
+            table = [a & b for a, b in zip(old, table)]
+        self.constraints[i][j] = table
+
+    def add_not_equal_constraint_one_way(self, i, j):
+        """Add a NOT_EQUAL constraint from variable 'i' to 'j', given by
+        name, without compiling a support table.
+        """
+        self.unshare()
+        i, j = self.index[i], self.index[j]
+        if j in self.constraints[i]:
+            i, j = self.names[i], self.names[j]
+            self.add_constraint_one_way(i, j, lambda x, y: x != y)
+        else:
+            self.constraints[i][j] = NOT_EQUAL
+
+    def add_all_different_constraint(self, variables, reasoning='pairwise'):
+        for (i, j) in self.get_all_possible_pairs(variables, variables):
+            if i != j:
+                self.add_not_equal_constraint_one_way(i, j)
+        self.add_all_different_reasoning(
+            [self.index[name] for name in variables], reasoning)
+
+    def backtracking_search(self):
+        assignment = CSP.backtracking_search(self)
+        if not assignment:
+            return assignment
+        return self.solution(assignment)
+
+    def solution(self, assignment):
+        return {self.names[i]: [self.values[bit_values(mask)[0]]]
+                for i, mask in enumerate(assignment)}
+
+    def is_complete(self, assignment):
+        for mask in assignment:
+            if not mask or mask & (mask - 1):
+                return False
+        return True
+
+    def copy_assignment(self, assignment):
+        return list(assignment)
+
+    def assign(self, assignment, var, value):
+        self.restrict(assignment, var, self.bits[value])
+
+    def restrict(self, assignment, var, mask):
+        """Set the domain of 'var' in 'assignment' to 'mask', recording
+        the old one on the trail.
+        """
+        if self.trail is not None:
+            self.trail.append((var, assignment[var]))
+        self.resized(var, assignment[var].bit_count(), mask.bit_count())
+        assignment[var] = mask
+
+    def keep_values(self, assignment, var, values):
+        mask = 0
+        for value in values:
+            mask |= self.bits[value]
+        if assignment[var] & ~mask:
+            self.restrict(assignment, var, assignment[var] & mask)
+
+    def size_of(self, domain):
+        return domain.bit_count()
+
+    def initial_domains(self):
+        return self.domains
+
+    def domain_values(self, assignment, var):
+        return [self.values[k] for k in bit_values(assignment[var])]
+
+    def conflicts(self, assignment, var, value, other):
+        constraint = self.constraints[var][other]
+        bit = self.bits[value]
+        if constraint is NOT_EQUAL:
+            return 1 if assignment[other] & bit else 0
+        k = bit.bit_length() - 1
+        return (assignment[other] & ~constraint[k]).bit_count()
+
+    def revise_2001(self, assignment, i, j):
+        return self.revise(assignment, i, j)
+
+    def revise(self, assignment, i, j):
+        domain = assignment[i]
+        other = assignment[j]
+        constraint = self.constraints[i][j]
+        if constraint is NOT_EQUAL:
+            # A value of i only loses its support when it is the single
+            # value left for j
+            if other & (other - 1) == 0 and domain & other:
+                self.restrict(assignment, i, domain & ~other)
+                return True
+            if not other and domain:
+                self.restrict(assignment, i, 0)
+                return True
+            return False
+        kept = domain
+        for k in bit_values(domain):
+            if not constraint[k] & other:
+                kept &= ~(1 << k)
+        if kept == domain:
+            return False
+        self.restrict(assignment, i, kept)
+        return True
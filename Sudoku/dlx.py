@@ -0,0 +1,273 @@
+import copy
+
+from assignment5 import box_shape, sudoku_symbols
+
+
+class DLX:
+    """An exact cover solver, Knuth's Algorithm X with dancing links.
+
+    The problem is a set of columns, which all have to be covered exactly
+    once, and a set of rows, which each cover some of the columns. The
+    nodes of the sparse 0/1 matrix are kept in flat lists instead of
+    objects: node 0 is the root, nodes 1 to self.columns are the column
+    headers, and every 1 in the matrix is a node after those, linked to
+    its neighbours by self.left, self.right, self.up and self.down.
+    Covering a column unlinks it and every row that uses it, and
+    uncovering links them back in the reverse order, so the search never
+    copies anything.
+
+    self.calls and self.failure count the search nodes and the dead ends,
+    like CSP.calls and CSP.failure.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        headers = columns + 1
+        self.left = [node - 1 for node in range(headers)]
+        self.left[0] = columns
+        self.right = [node + 1 for node in range(headers)]
+        self.right[columns] = 0
+        self.up = list(range(headers))
+        self.down = list(range(headers))
+        # the column header of every node, and the row of every node
+        # after the headers
+        self.column = list(range(headers))
+        self.row = [None] * headers
+        # the number of nodes still linked into every column
+        self.size = [0] * headers
+        # self.rows[r] is the label of row r, and self.first[r] one of
+        # its nodes
+        self.rows = []
+        self.first = []
+        # the rows chosen up front by select(), and whether one of them
+        # clashed with another
+        self.selected = []
+        self.inconsistent = False
+        self.calls = 0
+        self.failure = 0
+
+    def add_row(self, label, columns):
+        """Add a row covering 'columns' (indices from 0), and return its
+        index. 'label' is what the solutions list for it.
+        """
+        r = len(self.rows)
+        self.rows.append(label)
+        first = len(self.column)
+        for c in columns:
+            header = c + 1
+            node = len(self.column)
+            self.column.append(header)
+            self.row.append(r)
+            self.up.append(self.up[header])
+            self.down.append(header)
+            self.down[self.up[header]] = node
+            self.up[header] = node
+            self.size[header] += 1
+            self.left.append(node - 1)
+            self.right.append(node + 1)
+        self.left[first] = len(self.column) - 1
+        self.right[-1] = first
+        self.first.append(first)
+        return r
+
+    def copy(self):
+        """Get a copy that can be selected on and searched on its own.
+        Only the links and the selected rows are copied, the rest of the
+        matrix never changes and is shared.
+        """
+        other = copy.copy(self)
+        other.left = list(self.left)
+        other.right = list(self.right)
+        other.up = list(self.up)
+        other.down = list(self.down)
+        other.size = list(self.size)
+        other.selected = list(self.selected)
+        other.calls = 0
+        other.failure = 0
+        return other
+
+    def cover(self, header):
+        left, right, up, down = self.left, self.right, self.up, self.down
+        column, size = self.column, self.size
+        right[left[header]] = right[header]
+        left[right[header]] = left[header]
+        i = down[header]
+        while i != header:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                size[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def uncover(self, header):
+        left, right, up, down = self.left, self.right, self.up, self.down
+        column, size = self.column, self.size
+        i = up[header]
+        while i != header:
+            j = left[i]
+            while j != i:
+                size[column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[header]] = header
+        left[right[header]] = header
+
+    def select(self, r):
+        """Put row 'r' in every solution, like a given of a puzzle. When
+        one of its columns is covered by a row selected before, there are
+        no solutions at all.
+        """
+        node = self.first[r]
+        while True:
+            header = self.column[node]
+            if self.left[self.right[header]] != header:
+                # already unlinked by another selected row
+                self.inconsistent = True
+                return
+            self.cover(header)
+            node = self.right[node]
+            if node == self.first[r]:
+                break
+        self.selected.append(r)
+
+    def solutions(self):
+        """Generate every exact cover as a list of row labels, the
+        selected rows first. Stop iterating to stop the search.
+        """
+        if self.inconsistent:
+            return iter(())
+        return self.search([self.rows[r] for r in self.selected])
+
+    def search(self, chosen):
+        """Algorithm X: cover a column with the fewest rows left by each
+        of its rows in turn, and search the rest of the matrix.
+        """
+        self.calls += 1
+        right, size = self.right, self.size
+        header = right[0]
+        if header == 0:
+            yield list(chosen)
+            return
+        best = header
+        while header != 0 and size[best] > 1:
+            if size[header] < size[best]:
+                best = header
+            header = right[header]
+        found = False
+        if size[best]:
+            # try/finally, so that the links are restored even when the
+            # caller stops iterating halfway
+            self.cover(best)
+            try:
+                i = self.down[best]
+                while i != best:
+                    chosen.append(self.rows[self.row[i]])
+                    j = right[i]
+                    while j != i:
+                        self.cover(self.column[j])
+                        j = right[j]
+                    try:
+                        for solution in self.search(chosen):
+                            found = True
+                            yield solution
+                    finally:
+                        j = self.left[i]
+                        while j != i:
+                            self.uncover(self.column[j])
+                            j = self.left[j]
+                        chosen.pop()
+                    i = self.down[i]
+            finally:
+                self.uncover(best)
+        if not found:
+            self.failure += 1
+
+
+class SudokuDLX(DLX):
+    """A Sudoku board as an exact cover problem, with the search interface
+    of CSP: backtracking_search(), solutions() and count_solutions(), with
+    the solutions in the same dictionary format.
+
+    Every (row, col, value) choice is a matrix row, covering four columns:
+    its cell, and the value in its row, its column and its box. The
+    matrix of an empty NxN board is built here, and the givens of a board
+    are selected on a copy of it by select_givens, see create_sudoku_dlx.
+    """
+
+    def __init__(self, n):
+        box_rows, box_cols = box_shape(n)
+        DLX.__init__(self, 4 * n * n)
+        self.n = n
+        self.symbols = symbols = sudoku_symbols(n)
+        # the matrix row of every (row, col, value)
+        self.choices = choices = {}
+        for row in range(n):
+            for col in range(n):
+                box = (row // box_rows) * box_rows + col // box_cols
+                for k, value in enumerate(symbols):
+                    choices[row, col, value] = self.add_row(
+                        ('%d-%d' % (row, col), value),
+                        (row * n + col,
+                         n * n + row * n + k,
+                         2 * n * n + col * n + k,
+                         3 * n * n + box * n + k))
+
+    def select_givens(self, board):
+        """Select the rows of the givens of 'board', a list of N strings
+        of N values with 0 for the empty cells.
+        """
+        n, symbols = self.n, self.symbols
+        if len(board) != n:
+            raise ValueError('not a %dx%d board' % (n, n))
+        for row in range(n):
+            if len(board[row]) != n:
+                raise ValueError('row %d of a %dx%d board has %d cells' %
+                                 (row + 1, n, n, len(board[row])))
+            for col in range(n):
+                value = board[row][col]
+                if value in '0.':
+                    continue
+                if value not in symbols:
+                    raise ValueError('not a value of a %dx%d board: %s' %
+                                     (n, n, value))
+                self.select(self.choices[row, col, value])
+
+    def backtracking_search(self):
+        """Return the first solution, or False if there is none."""
+        for solution in self.solutions():
+            return solution
+        return False
+
+    def solutions(self):
+        for rows in DLX.solutions(self):
+            yield {var: [value] for var, value in rows}
+
+    def count_solutions(self, limit=None):
+        """Count the solutions, stopping at 'limit' if given."""
+        count = 0
+        for _ in DLX.solutions(self):
+            count += 1
+            if count == limit:
+                break
+        return count
+
+
+# The matrices of empty boards built by create_sudoku_dlx, by board size
+_templates = {}
+
+
+def create_sudoku_dlx(board):
+    """Get a SudokuDLX for 'board', a list of N strings of N values with 0
+    for the empty cells. The matrix of an empty NxN board is built once,
+    and copied for every board.
+    """
+    n = len(board)
+    if n not in _templates:
+        _templates[n] = SudokuDLX(n)
+    dlx = _templates[n].copy()
+    dlx.select_givens(board)
+    return dlx
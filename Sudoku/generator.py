@@ -0,0 +1,117 @@
+import argparse
+import random
+
+from assignment5 import create_sudoku_csp_from_board
+
+# The CSP options used to fill the solutions, the fastest ones
+SOLVER_OPTIONS = {
+    'compact': True,
+    'use_trail': True,
+    'propagation': 'ac3',
+    'variable_ordering': 'mrv',
+}
+
+
+def rows_of(cells):
+    """Convert 81 cells (a string or list of digits) into nine rows."""
+    cells = ''.join(cells)
+    return [cells[row * 9:(row + 1) * 9] for row in range(9)]
+
+
+def count_solutions(cells, limit=2):
+    """Count the solutions of a puzzle of 81 cells, 0 for the empty ones,
+    stopping at 'limit'. The exact cover solver is used, which is the
+    fastest at this.
+    """
+    return create_sudoku_csp_from_board(rows_of(cells),
+                                        dlx=True).count_solutions(limit)
+
+
+def random_solution(rng):
+    """Get a random solved board as 81 digits. The three boxes on the
+    diagonal don't share a row or column, so they are filled with random
+    permutations first, and the CSP solver fills in the rest.
+    """
+    cells = ['0'] * 81
+    for box in range(3):
+        digits = [str(value) for value in range(1, 10)]
+        rng.shuffle(digits)
+        for k, digit in enumerate(digits):
+            row, col = box * 3 + k // 3, box * 3 + k % 3
+            cells[row * 9 + col] = digit
+    csp = create_sudoku_csp_from_board(rows_of(cells), False,
+                                       **SOLVER_OPTIONS)
+    solution = csp.backtracking_search()
+    return ''.join(solution['%d-%d' % (row, col)][0]
+                   for row in range(9) for col in range(9))
+
+
+def generate(clues, rng, attempts=20):
+    """Generate a uniquely solvable puzzle with 'clues' given cells, as
+    (puzzle, solution) strings of 81 digits. The givens of a random
+    solution are removed in a random order, as long as the solution stays
+    unique. When that gets stuck above 'clues' givens, a new solution is
+    tried, up to 'attempts' times; the puzzle with the fewest givens found
+    is returned then.
+    """
+    best = None
+    for _ in range(attempts):
+        solution = random_solution(rng)
+        puzzle = list(solution)
+        order = list(range(81))
+        rng.shuffle(order)
+        given = 81
+        for cell in order:
+            if given == clues:
+                break
+            digit = puzzle[cell]
+            puzzle[cell] = '0'
+            if count_solutions(puzzle) == 1:
+                given -= 1
+            else:
+                puzzle[cell] = digit
+        if best is None or given < best[0]:
+            best = given, ''.join(puzzle), solution
+        if given == clues:
+            break
+    return best[1], best[2]
+
+
+def generate_corpus(clue_counts, per_count, seed=0):
+    """Generate 'per_count' puzzles for every clue count, and yield them
+    as (clues, puzzle, solution). The corpus only depends on the seed.
+    """
+    rng = random.Random(seed)
+    for clues in clue_counts:
+        for _ in range(per_count):
+            puzzle, solution = generate(clues, rng)
+            yield 81 - puzzle.count('0'), puzzle, solution
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Generates uniquely solvable Sudoku puzzles, one per '
+                    'line of 81 cells, graded by their number of givens.')
+    parser.add_argument('-c', '--clues', type=int, action='append',
+                        help='number of givens (repeatable, default 36, '
+                             '30, 26 and 24)')
+    parser.add_argument('-n', '--count', type=int, default=10,
+                        help='puzzles per number of givens')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the corpus')
+    parser.add_argument('-o', '--output', default='corpus.txt',
+                        help='puzzle file to write')
+    args = parser.parse_args(argv)
+    clue_counts = args.clues or [36, 30, 26, 24]
+    count = 0
+    with open(args.output, 'w') as f:
+        for clues, puzzle, _ in generate_corpus(clue_counts, args.count,
+                                                args.seed):
+            f.write(puzzle + '\n')
+            count += 1
+            print('%3d givens: %s' % (clues, puzzle))
+    print('Wrote %d puzzles to %s' % (count, args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+import argparse
+import os
+import time
+from multiprocessing import Pool
+
+from assignment5 import create_sudoku_csp_from_board, print_sudoku_solution
+
+# The solver configurations raced by solve_portfolio: the create_sudoku_csp
+# options, and 'restart_unit' to search with restarts. The deterministic
+# ones come first, then randomised ones with different seeds, orderings
+# and propagations, which restart as the Luby sequence says.
+PORTFOLIO = [
+    {'select_randomly': False, 'compact': True, 'use_trail': True,
+     'propagation': 'ac3', 'variable_ordering': 'mrv',
+     'all_different': 'subsets'},
+    {'select_randomly': False, 'compact': True, 'use_trail': True,
+     'propagation': 'ac3', 'variable_ordering': 'domwdeg',
+     'restart_unit': 20},
+    {'select_randomly': True, 'seed': 1, 'compact': True, 'use_trail': True,
+     'propagation': 'ac3', 'variable_ordering': 'mrv', 'restart_unit': 10},
+    {'select_randomly': True, 'seed': 2, 'compact': True, 'use_trail': True,
+     'propagation': 'ac3', 'variable_ordering': 'domwdeg',
+     'restart_unit': 10},
+    {'select_randomly': True, 'seed': 3, 'compact': True, 'use_trail': True,
+     'propagation': 'ac3', 'variable_ordering': 'first', 'restart_unit': 10},
+    {'select_randomly': True, 'seed': 4, 'compact': True, 'use_trail': True,
+     'propagation': 'ac2001', 'variable_ordering': 'mrv',
+     'all_different': 'singles', 'restart_unit': 5},
+    {'select_randomly': True, 'seed': 5, 'compact': True, 'use_trail': True,
+     'propagation': 'full', 'variable_ordering': 'mrv', 'restart_unit': 10},
+    {'select_randomly': True, 'seed': 6, 'compact': True, 'use_trail': True,
+     'propagation': 'ac3', 'variable_ordering': 'mrv',
+     'value_ordering': 'lcv', 'restart_unit': 20},
+]
+
+
+def run_configuration(job):
+    """Solve a (board, configuration) job, and return the result as a
+    dictionary: the configuration, the solution (None if there is none),
+    the calls, failure and restarts counts and the time.
+    """
+    board, configuration = job
+    options = dict(configuration)
+    unit = options.pop('restart_unit', None)
+    started = time.perf_counter()
+    csp = create_sudoku_csp_from_board(board, **options)
+    if unit is None:
+        solution = csp.backtracking_search()
+    else:
+        solution = csp.restarting_search(unit)
+    return {
+        'configuration': configuration,
+        'solution': solution or None,
+        'calls': csp.calls,
+        'failure': csp.failure,
+        'restarts': csp.restarts,
+        'time': time.perf_counter() - started,
+    }
+
+
+def solve_portfolio(board, configurations=None, workers=None):
+    """Race the configurations (default PORTFOLIO) on a board, one worker
+    process each, and return the result of the first one to finish, see
+    run_configuration. The other workers are terminated then. Every
+    configuration searches the whole board, so the first to finish
+    without a solution has shown that there is none.
+    """
+    configurations = configurations or PORTFOLIO
+    workers = min(workers or os.cpu_count() or 1, len(configurations))
+    jobs = [(board, configuration) for configuration in configurations]
+    # leaving the with block terminates the pool, cancelling the rest
+    with Pool(workers) as pool:
+        for result in pool.imap_unordered(run_configuration, jobs):
+            return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Solves Sudoku boards by racing several solver '
+                    'configurations, with randomised restarts, in a '
+                    'process pool.')
+    parser.add_argument('boards', nargs='+', help='board files')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='worker processes (default: all cores, at '
+                             'most one per configuration)')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help="don't print the solutions")
+    args = parser.parse_args(argv)
+
+    for filename in args.boards:
+        with open(filename) as f:
+            board = [line.strip() for line in f if line.strip()]
+        started = time.perf_counter()
+        result = solve_portfolio(board, workers=args.workers)
+        elapsed = time.perf_counter() - started
+        print('%s: %.3fs, won by %s (calls %d, failure %d, restarts %d)' %
+              (filename, elapsed, result['configuration'], result['calls'],
+               result['failure'], result['restarts']))
+        if result['solution'] is None:
+            print('No solution')
+        elif not args.quiet:
+            print_sudoku_solution(result['solution'])
+
+
+if __name__ == '__main__':
+    main()
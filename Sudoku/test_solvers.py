@@ -0,0 +1,169 @@
+import os
+import random
+
+import pytest
+
+from assignment5 import box_shape, create_map_coloring_csp, \
+    create_sudoku_csp, create_sudoku_csp_from_board, sudoku_symbols
+from batch import parse_puzzle, solve_puzzle
+from generator import count_solutions, generate
+from portfolio import PORTFOLIO, solve_portfolio
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BOARDS = ['easy', 'medium', 'hard', 'veryhard']
+
+# The solver backends, as create_sudoku_csp options
+BACKENDS = [
+    {},
+    {'compact': True},
+    {'compact': True, 'use_trail': True, 'propagation': 'ac2001'},
+    {'use_trail': True, 'variable_ordering': 'domwdeg'},
+    {'compact': True, 'all_different': 'subsets'},
+    {'dlx': True},
+]
+
+
+def board_file(name):
+    return os.path.join(HERE, 'sudokus', name + '.txt')
+
+
+def read_board(name):
+    with open(board_file(name)) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def check_solution(board, solution):
+    """Check that 'solution' fills in 'board' by the rules of Sudoku."""
+    n = len(board)
+    box_rows, box_cols = box_shape(n)
+    cells = [[solution['%d-%d' % (row, col)] for col in range(n)]
+             for row in range(n)]
+    for row in range(n):
+        for col in range(n):
+            assert len(cells[row][col]) == 1
+            if board[row][col] not in '0.':
+                assert cells[row][col][0] == board[row][col]
+    symbols = sorted(sudoku_symbols(n))
+    for row in range(n):
+        assert sorted(cells[row][col][0] for col in range(n)) == symbols
+    for col in range(n):
+        assert sorted(cells[row][col][0] for row in range(n)) == symbols
+    for top in range(0, n, box_rows):
+        for left in range(0, n, box_cols):
+            box = [cells[row][col][0]
+                   for row in range(top, top + box_rows)
+                   for col in range(left, left + box_cols)]
+            assert sorted(box) == symbols
+
+
+@pytest.mark.parametrize('name', BOARDS)
+def test_backends_find_the_same_solution(name):
+    board = read_board(name)
+    solutions = []
+    for options in BACKENDS:
+        csp = create_sudoku_csp(board_file(name), False, **options)
+        solution = csp.backtracking_search()
+        check_solution(board, solution)
+        solutions.append(solution)
+    assert all(solution == solutions[0] for solution in solutions)
+
+
+@pytest.mark.parametrize('name', BOARDS)
+def test_backends_agree_on_unique_boards(name):
+    for options in BACKENDS:
+        csp = create_sudoku_csp(board_file(name), False, **options)
+        assert csp.count_solutions(limit=2) == 1
+
+
+def test_backends_agree_on_solution_counts():
+    # The easy board with givens taken away has many solutions
+    rng = random.Random(1)
+    board = read_board('easy')
+    givens = [(row, col) for row in range(9) for col in range(9)
+              if board[row][col] != '0']
+    for _ in range(2):
+        rows = [list(row) for row in board]
+        for row, col in rng.sample(givens, 8):
+            rows[row][col] = '0'
+        rows = [''.join(row) for row in rows]
+        counts = [create_sudoku_csp_from_board(rows, False, **options)
+                  .count_solutions(limit=50) for options in BACKENDS]
+        assert len(set(counts)) == 1
+        assert counts[0] > 1
+
+
+@pytest.mark.parametrize('n, limit, count', [(4, None, 288),
+                                             (6, 100, 100)])
+def test_backends_agree_on_empty_boards(n, limit, count):
+    rows = ['0' * n] * n
+    for options in BACKENDS:
+        csp = create_sudoku_csp_from_board(rows, False, **options)
+        assert csp.count_solutions(limit) == count
+
+
+def test_solutions_of_small_boards_are_valid():
+    for n in (4, 6):
+        rows = ['0' * n] * n
+        for options in BACKENDS:
+            csp = create_sudoku_csp_from_board(rows, False, **options)
+            for i, solution in enumerate(csp.solutions()):
+                check_solution(rows, solution)
+                if i == 20:
+                    break
+
+
+def test_contradictory_givens_have_no_solution():
+    rows = ['11' + '0' * 7] + ['0' * 9] * 8
+    for options in BACKENDS:
+        csp = create_sudoku_csp_from_board(rows, False, **options)
+        assert not csp.backtracking_search()
+        assert csp.count_solutions() == 0
+
+
+def test_malformed_boards_are_rejected():
+    for options in ({}, {'compact': True}, {'dlx': True}):
+        with pytest.raises(ValueError):
+            create_sudoku_csp(board_file('4'), **options)
+        with pytest.raises(ValueError):
+            create_sudoku_csp_from_board(['123'] * 9, **options)
+        with pytest.raises(ValueError):
+            create_sudoku_csp_from_board(['x' * 9] * 9, **options)
+
+
+def test_map_coloring_backends_agree():
+    plain = create_map_coloring_csp()
+    compact = create_map_coloring_csp(compact=True)
+    assert plain.count_solutions() == compact.count_solutions() > 0
+
+
+def test_restarting_search_solves():
+    board = read_board('hard')
+    for options in ({'compact': True, 'use_trail': True},
+                    {'select_randomly': True, 'seed': 3,
+                     'variable_ordering': 'domwdeg'}):
+        csp = create_sudoku_csp_from_board(board, **options)
+        check_solution(board, csp.restarting_search(5))
+
+
+def test_generated_puzzles_are_unique():
+    rng = random.Random(7)
+    for clues in (30, 26):
+        puzzle, solution = generate(clues, rng)
+        assert count_solutions(puzzle) == 1
+        assert all(p in '0' or p == s for p, s in zip(puzzle, solution))
+        board = parse_puzzle(puzzle)
+        result = solve_puzzle((puzzle, {'compact': True}))
+        assert result['solution'] == solution
+        csp = create_sudoku_csp_from_board(board, False)
+        assert csp.count_solutions(limit=2) == 1
+
+
+def test_batch_reports_unreadable_puzzles():
+    result = solve_puzzle(('123', {}))
+    assert 'error' in result
+
+
+def test_portfolio_solves():
+    board = read_board('medium')
+    result = solve_portfolio(board, PORTFOLIO[:3], workers=2)
+    check_solution(board, result['solution'])